@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Batch executor for command logs
+
+Usage:
+    python batch.py commands.txt [-o results.jsonl] [-w WORKERS] [--chunksize N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+from engine import execute
+
+# -------------------------------
+# WORKER
+# -------------------------------
+def _execute_chunk(commands):
+    return [execute(c).to_dict() for c in commands]
+
+
+def _chunks(lines, size):
+    chunk = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# -------------------------------
+# API
+# -------------------------------
+def run_batch(lines, workers=None, chunksize=2000):
+    """Ejecuta comandos en un pool de procesos; devuelve resultados en orden de entrada."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in _chunks(lines, chunksize):
+            yield from _execute_chunk(chunk)
+        return
+    with Pool(workers) as pool:
+        for results in pool.imap(_execute_chunk, _chunks(lines, chunksize)):
+            yield from results
+
+
+def summarize(results):
+    status = Counter()
+    functions = Counter()
+    total = 0
+    for r in results:
+        total += 1
+        status[r["status"]] += 1
+        if r["function"]:
+            functions[r["function"]] += 1
+    return {"total": total, "status": dict(status), "functions": dict(functions.most_common())}
+
+
+# -------------------------------
+# CLI
+# -------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate a file of terminal commands offline.")
+    parser.add_argument("path", help="File with one command per line ('-' for stdin)")
+    parser.add_argument("-o", "--output", help="Write per-command results as JSON lines")
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    src = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+    out = open(args.output, "w", encoding="utf-8") if args.output else None
+
+    def tee(results):
+        for r in results:
+            if out is not None:
+                out.write(json.dumps(r, ensure_ascii=False) + "\n")
+            yield r
+
+    start = time.perf_counter()
+    try:
+        summary = summarize(tee(run_batch(src, args.workers, args.chunksize)))
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if out is not None:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    summary["seconds"] = round(elapsed, 3)
+    summary["commands_per_second"] = round(summary["total"] / elapsed) if elapsed else None
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite with regression gates
+
+Usage:
+    python bench.py [--only parse,kb,...] [--save] [--threshold 0.25] [--history PATH] [--no-gate]
+
+Cada benchmark mide el tiempo por operación (mediana de varias repeticiones)
+con semillas y corpus fijos. Con --save el resultado se agrega como una
+línea JSON al historial; la compuerta compara contra la mediana de las
+últimas corridas guardadas y falla si algún hot path es más lento que
+(1 + threshold) veces esa referencia.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HISTORY_PATH = os.path.join(HERE, "benchmarks", "history.jsonl")
+
+CORPUS_SIZE = 5000
+SEED = 1234
+
+
+# -------------------------------
+# MEDICIÓN
+# -------------------------------
+def measure(fn, items, repeat=5):
+    """Microsegundos por ítem: mediana de `repeat` pasadas sobre `items`."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        runs.append((time.perf_counter() - start) / len(items) * 1e6)
+    return statistics.median(runs)
+
+
+def _corpus():
+    from loadtest import command_mix
+    return command_mix(CORPUS_SIZE, SEED)
+
+
+# -------------------------------
+# BENCHMARKS
+# -------------------------------
+def bench_parse():
+    from engine import parse_command
+    corpus = [c.upper() for c in _corpus()]
+    return {"parse_command_us": measure(parse_command, corpus)}
+
+
+def bench_kb():
+    import kb
+    import resources
+    from engine import execute
+
+    corpus = _corpus()
+    mnemonics = [c.replace("<GO>", "").split()[-1].upper() for c in corpus if not c.startswith("SEARCH")]
+    resources.warm_up()
+    return {
+        "kb_lookup_us": measure(kb.FUNCTION_KB.get, mnemonics),
+        "execute_us": measure(execute, corpus),
+    }
+
+
+def bench_panels():
+    import panels
+    import resources
+    from engine import execute
+
+    resources.warm_up()
+    results = [execute(c) for c in _corpus()]
+    cold = [r.function for r in results if r.status == "documented"]
+
+    def breakdown_cold(mnemonic):
+        panels._BREAKDOWN_CACHE.clear()
+        panels.breakdown_html(mnemonic)
+
+    return {
+        "output_html_us": measure(panels.output_html, results),
+        "breakdown_cold_us": measure(breakdown_cold, cold[:500]),
+    }
+
+
+def bench_charts():
+    import charts
+    import hazard
+    import marketdata
+    import portfolio
+    from curves import CURVE_BOOK
+
+    def render_cold(chart_type, context):
+        # Sin PNG cacheado ni datos derivados: se mide simulación, ajuste y render completos
+        for cache in (CURVE_BOOK, marketdata.SERIES_CACHE, hazard.PD_CACHE, portfolio.MATRIX_CACHE):
+            cache.clear()
+        charts.render_chart(chart_type, context, cache=charts.ChartCache())
+
+    out = {}
+    contexts = [f"BENCH{i} US" for i in range(5)]
+    for chart_type in sorted(charts.RENDERERS):
+        out[f"chart_{chart_type}_ms"] = measure(lambda ctx: render_cold(chart_type, ctx), contexts, repeat=3) / 1000
+    cache = charts.ChartCache()
+    charts.render_chart("credit_curve", "BENCH US", cache=cache)
+    out["chart_cache_hit_us"] = measure(lambda _: charts.render_chart("credit_curve", "BENCH US", cache=cache),
+                                        range(2000))
+    return out
+
+
+SCREENS = (
+    "PE<15 AND MKTCAP>1e9",
+    "(SECTOR=TECH OR SECTOR=HEALTH) AND NOT DIVYLD=0 AND ROE>=15",
+    "VOL>30 AND ADV>5M AND COUNTRY!=US",
+    "PB<1 OR DEBTEQ>2.5",
+    "BETA>=0.8 AND BETA<=1.2 AND EPSGR>10",
+)
+
+
+def bench_screen():
+    import screener
+
+    columns = screener.get_screener().columns
+    cold = screener.Screener(columns)
+    warm = screener.Screener(columns)
+    for query in SCREENS:
+        warm.screen(query)
+
+    def screen_cold(query):
+        # Sin máscaras ni resultados cacheados: índices ordenados + combinación de máscaras
+        cold.clear()
+        cold.screen(query)
+
+    return {
+        "screen_index_build_ms": measure(lambda _: screener.Screener(columns), range(3), repeat=3) / 1000,
+        "screen_cold_ms": measure(screen_cold, SCREENS) / 1000,
+        "screen_cached_us": measure(warm.screen, SCREENS * 100),
+    }
+
+
+def bench_startup():
+    from profiler import STARTUP_MODULES
+
+    code = f"import time; t = time.perf_counter(); import {', '.join(STARTUP_MODULES)}; " \
+           "resources.warm_up(); print((time.perf_counter() - t) * 1000)"
+    runs = []
+    for _ in range(5):
+        proc = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+        runs.append(float(proc.stdout.strip()))
+    return {"cold_startup_ms": statistics.median(runs)}
+
+
+BENCHMARKS = {
+    "parse": bench_parse,
+    "kb": bench_kb,
+    "panels": bench_panels,
+    "charts": bench_charts,
+    "screen": bench_screen,
+    "startup": bench_startup,
+}
+
+
+# -------------------------------
+# HISTORIAL Y COMPUERTA
+# -------------------------------
+def load_history(path=HISTORY_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_run(run, path=HISTORY_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run) + "\n")
+
+
+def reference(history, window=5):
+    """Mediana por métrica de las últimas `window` corridas en la misma máquina."""
+    host = platform.node()
+    recent = [r for r in history if r.get("host") == host][-window:]
+    metrics = {}
+    for run in recent:
+        for name, value in run["results"].items():
+            metrics.setdefault(name, []).append(value)
+    return {name: statistics.median(values) for name, values in metrics.items()}
+
+
+def regressions(results, ref, threshold):
+    return {
+        name: (value, ref[name])
+        for name, value in results.items()
+        if name in ref and ref[name] > 0 and value > ref[name] * (1 + threshold)
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the simulator benchmark suite.")
+    parser.add_argument("--only", help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--save", action="store_true", help="Append this run to the history file")
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--no-gate", action="store_true", help="Report only, never fail")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = {}
+    for name in names:
+        results.update({k: round(v, 3) for k, v in BENCHMARKS[name]().items()})
+
+    history = load_history(args.history)
+    ref = reference(history)
+    failed = regressions(results, ref, args.threshold)
+
+    for metric, value in results.items():
+        base = ref.get(metric)
+        delta = f"{(value / base - 1) * 100:+6.1f}%" if base else "   new"
+        flag = "  REGRESSION" if metric in failed else ""
+        print(f"{metric:<36} {value:>12.3f}  {delta}{flag}")
+
+    if args.save:
+        save_run({
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "results": results,
+        }, args.history)
+
+    if failed and not args.no_gate:
+        print(f"{len(failed)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+Chart rendering layer for the kb["chart"] types
+"""
+import io
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import marketdata
+
+# -------------------------------
+# REGISTRO DE RENDERERS
+# -------------------------------
+RENDERERS = {}
+
+
+def register(chart_type):
+    def decorator(fn):
+        RENDERERS[chart_type] = fn
+        return fn
+    return decorator
+
+
+CURVE_POINTS = 120
+
+
+def _curve_grid(maturities):
+    # Solo el tramo cubierto por los bonos ajustados: fuera de él la curva es extrapolación
+    return np.linspace(maturities.min(), maturities.max(), CURVE_POINTS)
+
+
+@register("credit_curve")
+def _credit_curve(ax, context):
+    from curves import CURVE_BOOK, issuer_curve
+
+    issuer = context or "GLOBAL"
+    # Los parámetros quedan en el CurveBook compartido: la segunda consulta no reajusta
+    _, maturities, spreads, green = issuer_curve("spread", issuer)
+    conv = ~green
+
+    grid = _curve_grid(maturities[conv])
+    curve = CURVE_BOOK.evaluate(issuer, grid)
+    ax.scatter(maturities[conv], spreads[conv], label="Conventional bonds")
+    ax.plot(grid, curve, linestyle="--", label="Issuer curve (NS)")
+    title = f"{issuer} credit curve"
+    if green.any():
+        # Greenium: diferencia media de los bonos verdes contra la curva convencional
+        greenium = (spreads[green] - CURVE_BOOK.evaluate(issuer, maturities[green])).mean()
+        ax.scatter(maturities[green], spreads[green], marker="^", label="Green bonds")
+        ax.plot(grid, curve + greenium, linestyle=":", label="Green-adjusted curve")
+        title += f" — greenium {greenium:+.1f} bps"
+    ax.set_title(title)
+    ax.set_xlabel("Maturity (years)")
+    ax.set_ylabel("Spread (bps)")
+    ax.legend(fontsize="small")
+
+
+@register("rate_curve")
+def _rate_curve(ax, context):
+    from curves import CURVE_BOOK, issuer_curve
+
+    curve = f"{context or 'GLOBAL'} RATES"
+    _, maturities, yields, _ = issuer_curve("yield", curve)
+
+    grid = _curve_grid(maturities)
+    ax.scatter(maturities, yields, label="Bonds")
+    for method, label in (("monotone", "Monotone cubic"), ("nelson_siegel", "Nelson-Siegel"),
+                          ("svensson", "Svensson")):
+        issuer_curve("yield", curve, method)
+        ax.plot(grid, CURVE_BOOK.evaluate(curve, grid, method), label=label)
+    ax.set_title(f"{context or 'GLOBAL'} rate curve")
+    ax.set_xlabel("Maturity (years)")
+    ax.set_ylabel("Yield (%)")
+    ax.legend(fontsize="small")
+
+
+@register("price_compare")
+def _price_compare(ax, context):
+    # Misma serie para BVAL, BGN y BT sobre el mismo contexto
+    p = marketdata.series("bond_price", context, 9)
+    ax.plot(np.arange(1, 11), p)
+
+
+@register("pd_curve")
+def _pd_curve(ax, context, recovery=0.40):
+    import hazard
+
+    issuer = context or "GLOBAL"
+    curve = hazard.PD_CACHE.get(
+        issuer, date.today().isoformat(), recovery,
+        lambda names: marketdata.term_structure("spread", names, hazard.DEFAULT_HORIZONS),
+    )
+    h = hazard.DEFAULT_HORIZONS
+    ax.plot(h, 100 * curve["pd"], marker="o", label="Cumulative PD")
+    ax.step(h, 100 * curve["hazard"], where="pre", linestyle="--", label="Hazard rate")
+    ax.set_xlabel("Horizon (years)")
+    ax.set_ylabel("%")
+    ax.set_title(f"{issuer} implied PD (recovery {recovery:.0%})")
+    ax.legend(fontsize="small")
+
+
+@register("credit_market")
+def _credit_market(ax, context):
+    t = np.arange(2018, 2026)
+    spreads = np.array([90, 110, 180, 140, 160, 155, 150, 145])
+    ax.plot(t, spreads)
+    ax.set_title("Corporate Credit Spread Index (bps)")
+
+
+RRG_SECTORS = ("Tech", "Financials", "Energy", "Health", "Industrials", "Utilities", "Materials", "Staples")
+
+
+@register("rrg_quadrant")
+def _rrg_quadrant(ax, context):
+    import rrg
+
+    # Sectores sintéticos contra el contexto como benchmark
+    benchmark = context or "SPX Index"
+    tickers = [f"{benchmark} {sector}" for sector in RRG_SECTORS]
+    snap = rrg.compute(RRG_SECTORS, marketdata.universe("equity", tickers, 199),
+                       marketdata.series("equity", benchmark, 199), smooth=10, tail=8)
+
+    ax.axhline(100, linewidth=0.8)
+    ax.axvline(100, linewidth=0.8)
+    for i, name in enumerate(RRG_SECTORS):
+        line, = ax.plot(snap["tail_ratio"][i], snap["tail_momentum"][i], linewidth=0.8, alpha=0.7)
+        ax.scatter(snap["rs_ratio"][i], snap["rs_momentum"][i], color=line.get_color())
+        ax.annotate(name, (snap["rs_ratio"][i], snap["rs_momentum"][i]), fontsize="small",
+                    xytext=(4, 4), textcoords="offset points")
+    for label, x, y in (("Leading", 0.98, 0.98), ("Weakening", 0.98, 0.02),
+                        ("Lagging", 0.02, 0.02), ("Improving", 0.02, 0.98)):
+        ax.text(x, y, label, transform=ax.transAxes, alpha=0.5,
+                ha="right" if x > 0.5 else "left", va="top" if y > 0.5 else "bottom")
+    ax.set_xlabel("JdK RS-Ratio")
+    ax.set_ylabel("JdK RS-Momentum")
+    ax.set_title(f"Relative Rotation Graph vs {benchmark}")
+
+
+@register("technical_price")
+def _technical_price(ax, context, indicators=("sma", "bollinger")):
+    from mpl_toolkits.axes_grid1 import make_axes_locatable
+
+    import indicators as ind
+
+    close, high, low, volume = marketdata.series("ohlcv", context, 249)
+    values = ind.IndicatorEngine(indicators).update(close, high, low, volume)
+
+    # Se muestran las últimas 100 barras; el resto sirve de warm-up de los indicadores
+    x = np.arange(100)
+    view = slice(-100, None)
+    ax.plot(x, close[view], label="Price")
+    for name in indicators:
+        if name == "bollinger":
+            ax.plot(x, values["bb_mid"][view], linewidth=0.8, label="BB mid")
+            ax.fill_between(x, values["bb_lower"][view], values["bb_upper"][view], alpha=0.15, label="Bollinger")
+        elif name in ind.OVERLAYS:
+            ax.plot(x, values[name][view], linewidth=0.8, label=name.upper())
+    ax.legend(loc="upper left", fontsize="small")
+    ax.set_title("Price Chart with Indicators (Mock)")
+
+    oscillators = [name for name in indicators if name in ind.OSCILLATORS]
+    ax.figure.set_figheight(4.8 + 1.4 * len(oscillators))
+    divider = make_axes_locatable(ax)
+    for name in oscillators:
+        sub = divider.append_axes("bottom", size="30%", pad=0.3, sharex=ax)
+        if name == "macd":
+            sub.plot(x, values["macd"][view], linewidth=0.8)
+            sub.plot(x, values["macd_signal"][view], linewidth=0.8)
+            sub.bar(x, values["macd_hist"][view], width=1.0, alpha=0.4)
+        else:
+            sub.plot(x, values[name][view], linewidth=0.8)
+        if name == "rsi":
+            sub.axhline(70, linestyle="--", linewidth=0.5)
+            sub.axhline(30, linestyle="--", linewidth=0.5)
+        sub.set_ylabel(name.upper(), fontsize="small")
+
+
+@register("portfolio_attribution")
+def _portfolio_attribution(ax, context):
+    from mpl_toolkits.axes_grid1 import make_axes_locatable
+
+    import portfolio
+
+    name = context or "GLOBAL"
+    r = portfolio.report(name)
+    ax.plot(100 * r["cumulative"], label="Portfolio")
+    ax.plot(100 * r["benchmark_cumulative"], linestyle="--", label="Benchmark")
+    ax.set_ylabel("Cumulative return (%)")
+    ax.legend(loc="upper left", fontsize="small")
+    ax.set_title(f"{name} vs benchmark — α {r['alpha']:+.2%}  β {r['beta']:.2f}  "
+                 f"TE {r['tracking_error']:.2%}  IR {r['information_ratio']:+.2f}", fontsize="medium")
+
+    # Brinson-Fachler por sector, efectos apilados
+    ax.figure.set_figheight(8.0)
+    sub = make_axes_locatable(ax).append_axes("bottom", size="90%", pad=0.5)
+    x = np.arange(len(r["sectors"]))
+    pos, neg = np.zeros(len(x)), np.zeros(len(x))
+    for effect in portfolio.EFFECTS:
+        values = 100 * r["attribution"][effect]
+        base = np.where(values >= 0, pos, neg)
+        sub.bar(x, values, bottom=base, label=effect.capitalize())
+        pos += np.maximum(values, 0)
+        neg += np.minimum(values, 0)
+    sub.axhline(0, linewidth=0.8)
+    sub.set_xticks(x)
+    sub.set_xticklabels(r["sectors"], rotation=30, ha="right", fontsize="small")
+    sub.set_ylabel("Attribution (%)")
+    sub.set_title(f"Brinson-Fachler attribution — active {r['active_return']:+.2%}", fontsize="medium")
+    sub.legend(fontsize="small")
+
+
+# -------------------------------
+# CACHE LRU + TTL (COMPARTIDO ENTRE SESIONES)
+# -------------------------------
+class ChartCache:
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, ttl=600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            stored_at, png = item
+            if time.monotonic() - stored_at > self.ttl:
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def put(self, key, png):
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic(), png)
+            self._bytes += len(png)
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._data)))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _drop(self, key):
+        _, png = self._data.pop(key)
+        self._bytes -= len(png)
+
+
+CHART_CACHE = ChartCache()
+
+
+# -------------------------------
+# RENDER
+# -------------------------------
+# Las series salen de marketdata, sembradas por (tipo de serie, contexto): el PNG depende
+# solo del gráfico, el contexto y las opciones
+def chart_key(chart_type, context=None, **options):
+    """Clave de cache de un render; la comparten las etapas de un pipeline con el mismo gráfico."""
+    return chart_type, context, tuple(sorted(options.items()))
+
+
+def render_chart(chart_type, context=None, cache=CHART_CACHE, **options):
+    if chart_type not in RENDERERS:
+        raise KeyError(f"Unknown chart type: {chart_type}")
+
+    key = chart_key(chart_type, context, **options)
+    png = cache.get(key)
+    if png is not None:
+        return png
+
+    # Figure sin pyplot: no entra al registro global y se libera al salir de scope
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    RENDERERS[chart_type](ax, context, **options)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    fig.clear()
+
+    png = buf.getvalue()
+    cache.put(key, png)
+    return png
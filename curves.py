@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Batched curve fitting for issuer spread curves (NIA) and rate curves (FIT)
+
+Métodos: "linear", "monotone" (cúbica monótona de Fritsch-Carlson),
+"nelson_siegel" y "svensson". Los bonos llegan como tres vectores planos
+(clave, vencimiento, valor); se agrupan en matrices rellenas con máscara y
+cada método resuelve todos los emisores a la vez. Para Nelson-Siegel y
+Svensson, con los tau fijos el problema es lineal en las betas: se barre
+una grilla de tau y en cada punto se resuelven por mínimos cuadrados todos
+los emisores con un único np.linalg.solve batcheado.
+"""
+import threading
+
+import numpy as np
+
+METHODS = ("linear", "monotone", "nelson_siegel", "svensson")
+
+TAU_GRID = np.array([0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0, 5.0, 7.0, 10.0])
+TAU2_GRID = np.array([3.0, 5.0, 8.0, 12.0, 20.0])
+
+_RIDGE = 1e-8
+
+
+# -------------------------------
+# AGRUPACIÓN DE BONOS
+# -------------------------------
+def _group(keys, maturities, values):
+    """Matrices (emisores x max_bonos) ordenadas por vencimiento, con máscara de validez."""
+    keys = np.asarray(keys)
+    maturities = np.asarray(maturities, dtype=float)
+    values = np.asarray(values, dtype=float)
+    order = np.lexsort((maturities, keys))
+    keys, maturities, values = keys[order], maturities[order], values[order]
+    uniq, start, counts = np.unique(keys, return_index=True, return_counts=True)
+    width = counts.max()
+    pos = np.arange(len(keys)) - np.repeat(start, counts)
+    row = np.repeat(np.arange(len(uniq)), counts)
+    t = np.full((len(uniq), width), np.nan)
+    y = np.full((len(uniq), width), np.nan)
+    t[row, pos] = maturities
+    y[row, pos] = values
+    return list(uniq), t, y, counts
+
+
+# -------------------------------
+# NELSON-SIEGEL / SVENSSON
+# -------------------------------
+def _ns_loadings(t, tau):
+    x = t / tau
+    decay = np.exp(-x)
+    slope = np.where(x > 0, (1 - decay) / np.where(x > 0, x, 1), 1.0)
+    return slope, slope - decay
+
+
+def _basis(t, taus):
+    slope, curvature = _ns_loadings(t, taus[0])
+    cols = [np.ones_like(t), slope, curvature]
+    if len(taus) > 1:
+        cols.append(_ns_loadings(t, taus[1])[1])
+    return np.stack(cols, axis=-1)
+
+
+def _wls(t, y, mask, taus):
+    """Betas y SSE para todos los emisores con los mismos tau: un solve batcheado."""
+    X = _basis(np.where(mask, t, 1.0), taus) * mask[..., None]
+    yy = np.where(mask, y, 0.0)
+    A = np.einsum("nmk,nml->nkl", X, X) + _RIDGE * np.eye(X.shape[-1])
+    b = np.einsum("nmk,nm->nk", X, yy)
+    beta = np.linalg.solve(A, b[..., None])[..., 0]
+    resid = (np.einsum("nmk,nk->nm", X, beta) - yy) * mask
+    return beta, np.einsum("nm,nm->n", resid, resid)
+
+
+def _fit_parametric(t, y, method):
+    mask = ~np.isnan(t)
+    grid = [(a,) for a in TAU_GRID]
+    if method == "svensson":
+        grid = [(a, b) for a in TAU_GRID for b in TAU2_GRID if b > a]
+    n, k = t.shape[0], len(grid[0]) + 2
+    best_sse = np.full(n, np.inf)
+    best = np.zeros((n, k + len(grid[0])))
+    for taus in grid:
+        beta, sse = _wls(t, y, mask, np.array(taus))
+        better = sse < best_sse
+        best_sse[better] = sse[better]
+        best[better, :k] = beta[better]
+        best[better, k:] = taus
+    return best
+
+
+def _eval_parametric(params, grid, method):
+    k = 3 if method == "nelson_siegel" else 4
+    beta, taus = params[:k], params[k:]
+    return _basis(np.asarray(grid, dtype=float), taus) @ beta
+
+
+# -------------------------------
+# LINEAL / CÚBICA MONÓTONA
+# -------------------------------
+def _pchip_slopes(t, y):
+    """Derivadas de Fritsch-Carlson para filas con el mismo número de puntos."""
+    h = np.diff(t, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta = np.where(h > 0, np.diff(y, axis=1) / h, 0.0)
+    d = np.zeros_like(y)
+    if t.shape[1] == 2:
+        d[:] = delta
+        return d
+    w1 = 2 * h[:, 1:] + h[:, :-1]
+    w2 = h[:, 1:] + 2 * h[:, :-1]
+    same_sign = delta[:, :-1] * delta[:, 1:] > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        harmonic = (w1 + w2) / (w1 / delta[:, :-1] + w2 / delta[:, 1:])
+    d[:, 1:-1] = np.where(same_sign, harmonic, 0.0)
+    # Extremos: fórmula de tres puntos con corrección de monotonía
+    for end, (h0, h1, d0, d1) in ((0, (h[:, 0], h[:, 1], delta[:, 0], delta[:, 1])),
+                                  (-1, (h[:, -1], h[:, -2], delta[:, -1], delta[:, -2]))):
+        e = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+        e = np.where(np.sign(e) != np.sign(d0), 0.0, e)
+        e = np.where((np.sign(d0) != np.sign(d1)) & (np.abs(e) > 3 * np.abs(d0)), 3 * d0, e)
+        d[:, end] = e
+    return d
+
+
+def _eval_knots(knots, grid, method):
+    t, y, d = knots
+    grid = np.clip(np.asarray(grid, dtype=float), t[0], t[-1])
+    if len(t) == 1:
+        return np.full_like(grid, y[0])
+    i = np.clip(np.searchsorted(t, grid, side="right") - 1, 0, len(t) - 2)
+    h = t[i + 1] - t[i]
+    s = (grid - t[i]) / h
+    if method == "linear":
+        return y[i] + s * (y[i + 1] - y[i])
+    h00 = (1 + 2 * s) * (1 - s) ** 2
+    h10 = s * (1 - s) ** 2
+    h01 = s * s * (3 - 2 * s)
+    h11 = s * s * (s - 1)
+    return h00 * y[i] + h10 * h * d[i] + h01 * y[i + 1] + h11 * h * d[i + 1]
+
+
+def _fit_knots(keys, t, y, counts, method):
+    out = {}
+    # Filas con igual número de bonos se procesan juntas como matriz densa
+    for count in np.unique(counts):
+        rows = np.flatnonzero(counts == count)
+        tt, yy = t[rows, :count], y[rows, :count]
+        dd = _pchip_slopes(tt, yy) if method == "monotone" and count > 1 else np.zeros_like(yy)
+        for r, row in enumerate(rows):
+            out[keys[row]] = (tt[r], yy[r], dd[r])
+    return out
+
+
+# -------------------------------
+# CACHE DE PARÁMETROS
+# -------------------------------
+class CurveBook:
+    """Parámetros ajustados por (clave, método): reconsultar es una evaluación, no un ajuste."""
+
+    def __init__(self):
+        self._params = {}
+        self._lock = threading.Lock()
+
+    def fit(self, keys, maturities, values, method="nelson_siegel"):
+        if method not in METHODS:
+            raise ValueError(f"Unknown curve method: {method}")
+        uniq, t, y, counts = _group(keys, maturities, values)
+        if method in ("linear", "monotone"):
+            fitted = _fit_knots(uniq, t, y, counts, method)
+        else:
+            params = _fit_parametric(t, y, method)
+            fitted = dict(zip(uniq, params))
+        with self._lock:
+            for key, p in fitted.items():
+                self._params[(key, method)] = p
+        return uniq
+
+    def __contains__(self, key_method):
+        return key_method in self._params
+
+    def params(self, key, method="nelson_siegel"):
+        return self._params[(key, method)]
+
+    def evaluate(self, key, grid, method="nelson_siegel"):
+        p = self._params[(key, method)]
+        if method in ("linear", "monotone"):
+            return _eval_knots(p, grid, method)
+        return _eval_parametric(p, grid, method)
+
+    def spread_between(self, key, other, grid, method="nelson_siegel"):
+        """Diferencia entre dos curvas sobre la grilla (p. ej. greenium: verde - convencional)."""
+        return self.evaluate(key, grid, method) - self.evaluate(other, grid, method)
+
+    def clear(self):
+        with self._lock:
+            self._params.clear()
+
+
+CURVE_BOOK = CurveBook()
+
+
+# -------------------------------
+# CURVAS SIMULADAS (NIA / FIT)
+# -------------------------------
+CURVE_BONDS = 14
+
+
+def issuer_curve(kind, name, method="nelson_siegel", book=CURVE_BOOK):
+    """Bonos simulados de la curva `name`, ajustada en `book` si aún no lo está.
+
+    Gráficos y exportación pasan por aquí para que la curva de una clave no
+    dependa de quién la ajustó primero. Spread (NIA): se ajusta con los bonos
+    convencionales; los verdes quedan fuera para medir el greenium. Tasas
+    (FIT): todos los bonos.
+    """
+    import marketdata
+
+    keys, maturities, values, green = marketdata.issuer_bonds(kind, [name], n_bonds=CURVE_BONDS)
+    if (name, method) not in book:
+        used = ~green if kind == "spread" else slice(None)
+        book.fit(keys[used], maturities[used], values[used], method)
+    return keys, maturities, values, green
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Headless command engine (no Streamlit dependency)
+"""
+import re
+from dataclasses import dataclass, field
+
+import search
+import suggest
+from kb import FUNCTION_KB
+from perf import NULL_TRACE
+
+# -------------------------------
+# PARSER
+# -------------------------------
+_GO_RE = re.compile(r"<GO>", re.IGNORECASE)
+
+
+def strip_go(cmd):
+    """Quita la tecla <GO> sin importar mayúsculas (<go>, <Go>)."""
+    return _GO_RE.sub("", cmd)
+
+
+def parse_command(cmd):
+    parts = strip_go(cmd).strip().split()
+    if not parts:
+        return None, None
+    if len(parts) == 1:
+        return None, parts[0]
+    return " ".join(parts[:-1]), parts[-1]
+
+
+PIPE = "|"
+MAX_STAGES = 8
+
+
+def split_pipeline(cmd):
+    """'IBM US BVAL | BGN | MIPD' -> ['IBM US BVAL', 'IBM US BGN', 'IBM US MIPD'].
+
+    Una etapa sin contexto propio (una sola palabra) hereda el último contexto visto. Los
+    comandos con prefijo (SEARCH, EQS, XLTP, PERF, HIST) ni heredan ni fijan contexto.
+    """
+    stages, context = [], None
+    for part in strip_go(cmd).split(PIPE):
+        words = part.split()
+        if not words:
+            raise ValueError("Empty stage in pipeline")
+        if words[0].upper() in COMMAND_PREFIXES:
+            stages.append(" ".join(words))
+            continue
+        if len(words) > 1:
+            context = " ".join(words[:-1])
+        stages.append(f"{context} {words[-1]}" if len(words) == 1 and context else " ".join(words))
+    if len(stages) > MAX_STAGES:
+        raise ValueError(f"Pipelines are limited to {MAX_STAGES} stages")
+    return stages
+
+
+# -------------------------------
+# RESULTADO ESTRUCTURADO
+# -------------------------------
+# status:
+#   "empty"        -> comando vacío
+#   "global"       -> función sin contexto
+#   "documented"   -> función con contexto y entrada en la KB
+#   "undocumented" -> función con contexto pero sin entrada en la KB
+#   "search"       -> búsqueda de texto libre (SEARCH <consulta> <GO>)
+#   "perf"         -> panel de performance (PERF <GO>)
+#   "history"      -> historial de comandos (HIST <GO>)
+#   "screen"       -> screener de acciones (EQS <filtro> <GO>)
+#   "export"       -> exportación de la salida de otra función (XLTP <función> [contexto] <GO>)
+#   "pipeline"     -> varias funciones en un <GO> (IBM US BVAL | BGN | MIPD <GO>); ver `stages`
+@dataclass
+class CommandResult:
+    command: str
+    context: str = None
+    function: str = None
+    status: str = "empty"
+    kb: dict = field(default=None, repr=False)
+    chart: str = None
+    suggestions: list = field(default_factory=list)
+    query: str = None
+    matches: list = field(default_factory=list)
+    live: bool = False
+    screen: dict = field(default=None, repr=False)
+    error: str = None
+    stages: list = field(default_factory=list, repr=False)
+
+    def to_dict(self):
+        return {
+            "command": self.command,
+            "context": self.context,
+            "function": self.function,
+            "status": self.status,
+            "chart": self.chart,
+            "suggestions": self.suggestions,
+            "query": self.query,
+            "matches": self.matches,
+            "error": self.error,
+            "stages": [stage.to_dict() for stage in self.stages],
+        }
+
+
+# -------------------------------
+# EJECUCIÓN
+# -------------------------------
+SEARCH_PREFIX = "SEARCH"
+
+# Funciones con panel de precios en vivo
+LIVE_FUNCTIONS = frozenset({"BGN", "BT"})
+
+
+# Comando oculto: panel de performance del proceso (PERF <GO>, PERF PROFILE <GO>)
+PERF_COMMAND = "PERF"
+HIST_COMMAND = "HIST"
+
+# EQS con filtro corre el screener; EQS solo sigue siendo la ficha de la KB
+SCREEN_PREFIX = "EQS"
+
+# XLTP con argumentos exporta; XLTP solo sigue siendo la ficha de la KB
+EXPORT_PREFIX = "XLTP"
+
+# Comandos cuya primera palabra no es un contexto
+COMMAND_PREFIXES = frozenset({SEARCH_PREFIX, SCREEN_PREFIX, EXPORT_PREFIX, PERF_COMMAND, HIST_COMMAND})
+
+# Resultados con efectos propios en la app (exportar, armar el profiler, leer el journal):
+# dentro de un pipeline solo se mostraría el panel, así que se rechazan
+NOT_IN_PIPELINE = frozenset({"perf", "history", "export"})
+
+
+def execute(command, trace=NULL_TRACE):
+    if PIPE in command and not command.lstrip().upper().startswith((SEARCH_PREFIX, SCREEN_PREFIX, EXPORT_PREFIX)):
+        result = CommandResult(command=command, function="PIPELINE", status="pipeline")
+        try:
+            result.stages = [execute(stage, trace) for stage in split_pipeline(command)]
+        except ValueError as exc:
+            result.error = str(exc)
+        rejected = [stage.function for stage in result.stages if stage.status in NOT_IN_PIPELINE]
+        if rejected:
+            result.error = f"{', '.join(rejected)} can't run inside a pipeline; run it as its own command"
+            result.stages = []
+        return result
+
+    text = strip_go(command).strip()
+    head, _, query = text.partition(" ")
+    if head.upper() == SEARCH_PREFIX and query.strip():
+        result = CommandResult(command=command, function=SEARCH_PREFIX, status="search", query=query.strip())
+        with trace.stage("kb_lookup"):
+            result.matches = search.get_index().search(result.query)
+        return result
+    if head.upper() == PERF_COMMAND and query.strip().upper() in ("", "PROFILE"):
+        return CommandResult(command=command, function=PERF_COMMAND, status="perf", query=query.strip().upper())
+    if head.upper() == SCREEN_PREFIX and query.strip():
+        # numpy solo se importa cuando se pide un screen
+        from screener import ScreenError, get_screener
+
+        result = CommandResult(command=command, function=SCREEN_PREFIX, status="screen", query=query.strip())
+        with trace.stage("kb_lookup"):
+            try:
+                result.screen = get_screener().screen(result.query)
+                result.matches = list(result.screen["rows"]["TICKER"])
+            except ScreenError as exc:
+                result.error = str(exc)
+        return result
+    if head.upper() == EXPORT_PREFIX and query.strip():
+        from export import ExportError, parse_request
+
+        result = CommandResult(command=command, function=EXPORT_PREFIX, status="export", query=query.strip())
+        try:
+            target, result.context, _ = parse_request(result.query)
+            result.matches = [target]
+        except ExportError as exc:
+            result.error = str(exc)
+        return result
+    if head.upper() == HIST_COMMAND:
+        return CommandResult(command=command, function=HIST_COMMAND, status="history", query=query.strip().upper())
+
+    with trace.stage("parse"):
+        context, function = parse_command(command.upper())
+    result = CommandResult(command=command, context=context, function=function)
+
+    if function is None:
+        return result
+
+    with trace.stage("kb_lookup"):
+        result.kb = FUNCTION_KB.get(function)
+        if result.kb is None:
+            result.suggestions = suggest.get_index().did_you_mean(function)
+
+    if context is None:
+        result.status = "global"
+    elif result.kb is not None:
+        result.status = "documented"
+        result.chart = result.kb["chart"]
+        result.live = function in LIVE_FUNCTIONS
+    else:
+        result.status = "undocumented"
+
+    return result
@@ -0,0 +1,446 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming export pipeline for XLTP (CSV, Parquet, XLSX)
+
+Usage:
+    python export.py BGN "IBM US" 1000000 --format parquet -o prices.parquet
+
+Cada función exportable es un generador de bloques columnares (dict de
+columna -> array) de a lo sumo EXPORT_CHUNK filas; los writers vuelcan
+bloque por bloque, así que la memoria no depende del tamaño del archivo.
+En la app los trabajos corren en un pool de hilos propio (el hilo de
+Streamlit solo consulta el progreso) y el archivo terminado se sirve desde
+static/ (server.enableStaticServing), que lo envía desde disco en streaming.
+"""
+import csv
+import itertools
+import os
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from html import escape
+
+import resources
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+EXPORT_DIR = os.path.join(HERE, "static", "exports")
+EXPORT_CHUNK = 50_000
+EXPORT_TTL = 3600
+DEFAULT_ROWS = 100_000
+MAX_ROWS = 5_000_000
+XLSX_MAX_ROWS = 1_048_576
+# Streamlit responde 404 en static/ a archivos de más de 200 MiB (MAX_APP_STATIC_FILE_SIZE)
+MAX_FILE_BYTES = 200 * 1024 * 1024
+FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet",
+           "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"}
+
+
+class ExportError(ValueError):
+    pass
+
+
+# -------------------------------
+# FUENTES (UNA POR FUNCIÓN)
+# -------------------------------
+# Cada fuente recibe (contexto, **opciones) y devuelve (nombre base, iterador de bloques)
+SOURCES = {}
+
+
+def source(*functions):
+    def decorator(fn):
+        for function in functions:
+            SOURCES[function] = fn
+        return fn
+    return decorator
+
+
+@source("BGN", "BVAL", "BT")
+def _prices(context, rows=DEFAULT_ROWS, **_):
+    """Barras de un minuto simuladas para el contexto, generadas bloque a bloque."""
+    import numpy as np
+
+    import marketdata
+
+    if not context:
+        raise ExportError("Price export needs a security, e.g. XLTP BGN IBM US <GO>")
+
+    def chunks():
+        rng = np.random.default_rng(marketdata.ticker_seed("export", context))
+        last = float(marketdata.series("bond_price", context, 9)[-1])
+        start = np.datetime64("2024-01-02T09:30")
+        for offset in range(0, rows, EXPORT_CHUNK):
+            n = min(EXPORT_CHUNK, rows - offset)
+            price = last * np.exp(np.cumsum(rng.normal(0.0, 0.0004, n)))
+            last = float(price[-1])
+            bar = np.arange(offset, offset + n)
+            yield {
+                "bar": bar,
+                "timestamp": (start + bar.astype("timedelta64[m]")).astype(str),
+                "price": np.round(price, 4),
+                "volume": rng.poisson(1200, n),
+            }
+
+    return f"{context}_{rows}_bars", chunks()
+
+
+def _curve_source(kind, context):
+    from curves import CURVE_BOOK, issuer_curve
+
+    # Mismo ajuste que el gráfico de NIA / FIT, lo haya pedido antes o no
+    keys, maturities, values, green = issuer_curve(kind, context)
+    fitted = CURVE_BOOK.evaluate(context, maturities)
+    block = {"issuer": keys, "maturity": maturities, "value": values}
+    if kind == "spread":
+        block["green"] = green
+    block.update({"fitted_ns": fitted, "residual": values - fitted})
+    return iter([block])
+
+
+@source("NIA")
+def _credit_curve(context, **_):
+    issuer = context or "GLOBAL"
+    return f"{issuer}_credit_curve", _curve_source("spread", issuer)
+
+
+@source("FIT")
+def _rate_curve(context, **_):
+    curve = f"{context or 'GLOBAL'} RATES"
+    return f"{curve}_rate_curve", _curve_source("yield", curve)
+
+
+@source("MIPD")
+def _pd_curve(context, recovery=0.40, **_):
+    import hazard
+
+    import marketdata
+
+    issuer = context or "GLOBAL"
+    surface = hazard.pd_surface(marketdata.term_structure("spread", [issuer], hazard.DEFAULT_HORIZONS),
+                                hazard.DEFAULT_HORIZONS, recovery)
+    return f"{issuer}_pd_curve", iter([{
+        "horizon_years": surface["horizons"],
+        "hazard": surface["hazard"][0],
+        "cumulative_pd": surface["pd"][0],
+        "marginal_pd": surface["marginal_pd"][0],
+    }])
+
+
+@source("PORT")
+def _portfolio(context, **_):
+    import numpy as np
+
+    import portfolio
+
+    name = context or "GLOBAL"
+    r = portfolio.report(name)
+    return f"{name}_portfolio", iter([{
+        "day": np.arange(1, len(r["returns"]) + 1),
+        "portfolio_return": r["returns"],
+        "benchmark_return": r["benchmark_returns"],
+        "active_return": r["returns"] - r["benchmark_returns"],
+        "portfolio_cumulative": r["cumulative"],
+        "benchmark_cumulative": r["benchmark_cumulative"],
+    }])
+
+
+@source("EQS")
+def _screen(context, **_):
+    import numpy as np
+
+    from screener import COUNTRIES, SECTORS, ScreenError, get_screener
+
+    if not context:
+        raise ExportError("Screen export needs a filter, e.g. XLTP EQS PE<15 AND MKTCAP>1e9 <GO>")
+    screener = get_screener()
+    try:
+        index = screener.matches(context)
+    except ScreenError as exc:
+        raise ExportError(str(exc)) from exc
+
+    def chunks():
+        for offset in range(0, len(index), EXPORT_CHUNK):
+            rows = index[offset:offset + EXPORT_CHUNK]
+            block = {name: screener.columns[name][rows] for name in screener.columns}
+            block["SECTOR"] = np.asarray(SECTORS, dtype=object)[block["SECTOR"]]
+            block["COUNTRY"] = np.asarray(COUNTRIES, dtype=object)[block["COUNTRY"]]
+            yield block
+
+    return "equity_screen", chunks()
+
+
+@source("HIST")
+def _history(context, session=None, **_):
+    import journal
+
+    hist = journal.get_journal()
+    hist.flush()
+    scope = None if (context or "").upper() == "ALL" else session
+
+    def chunks():
+        rows = []
+        for row in hist.iter_rows(session=scope):
+            rows.append(row)
+            if len(rows) == EXPORT_CHUNK:
+                yield dict(zip(journal.COLUMNS, map(list, zip(*rows))))
+                rows = []
+        if rows:
+            yield dict(zip(journal.COLUMNS, map(list, zip(*rows))))
+
+    return "command_history", chunks()
+
+
+def parse_request(query):
+    """'BGN IBM US 1000000' -> ('BGN', 'IBM US', {'rows': 1000000})."""
+    words = (query or "").split()
+    if not words:
+        raise ExportError(f"Usage: XLTP <function> [context] <GO>. Exportable: {', '.join(sorted(SOURCES))}")
+    function = words[0].upper()
+    if function not in SOURCES:
+        raise ExportError(f"{function} has no tabular output. Exportable: {', '.join(sorted(SOURCES))}")
+    rest = words[1:]
+    options = {}
+    if function != "EQS" and rest and rest[-1].replace("_", "").isdigit():
+        options["rows"] = int(rest.pop())
+        if not 0 < options["rows"] <= MAX_ROWS:
+            raise ExportError(f"Rows must be between 1 and {MAX_ROWS:,}")
+    context = " ".join(rest)
+    return function, (context if function == "EQS" else context.upper()) or None, options
+
+
+# -------------------------------
+# WRITERS (BLOQUE A BLOQUE)
+# -------------------------------
+def _columns(chunk):
+    return [list(v) if not hasattr(v, "tolist") else v.tolist() for v in chunk.values()]
+
+
+def write_csv(path, chunks, progress):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        for i, chunk in enumerate(chunks):
+            if i == 0:
+                writer.writerow(chunk)
+            writer.writerows(zip(*_columns(chunk)))
+            progress(len(next(iter(chunk.values()))))
+
+
+def write_parquet(path, chunks, progress):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ExportError("Parquet export needs pyarrow (pip install pyarrow)") from exc
+
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.table({name: list(v) if getattr(v, "dtype", None) == object else v
+                              for name, v in chunk.items()})
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression="snappy")
+            # Un row group por bloque: el writer no acumula el archivo en memoria
+            writer.write_table(table.cast(writer.schema))
+            progress(table.num_rows)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/></Relationships>'),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="XLTP" sheetId="1" r:id="rId1"/></sheets></workbook>'),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/></Relationships>'),
+}
+
+
+def _xlsx_cell(value):
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return "<c/>" if value != value else f"<c><v>{value!r}</v></c>"
+    if value is None:
+        return "<c/>"
+    return f'<c t="inlineStr"><is><t>{escape(str(value), quote=False)}</t></is></c>'
+
+
+def write_xlsx(path, chunks, progress):
+    """XLSX mínimo (una hoja, strings inline) escrito en streaming dentro del zip."""
+    written = 0
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, xml in _XLSX_PARTS.items():
+            zf.writestr(name, xml)
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            for i, chunk in enumerate(chunks):
+                n = len(next(iter(chunk.values())))
+                if written + n + 1 > XLSX_MAX_ROWS:
+                    raise ExportError(f"XLSX holds at most {XLSX_MAX_ROWS - 1:,} rows; use CSV or Parquet")
+                if i == 0:
+                    sheet.write(("<row>" + "".join(_xlsx_cell(c) for c in chunk) + "</row>").encode("utf-8"))
+                sheet.write("".join("<row>" + "".join(_xlsx_cell(v) for v in row) + "</row>"
+                                    for row in zip(*_columns(chunk))).encode("utf-8"))
+                written += n
+                progress(n)
+            sheet.write(b"</sheetData></worksheet>")
+
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet, "xlsx": write_xlsx}
+
+
+def export(function, context, fmt, path, progress=lambda n: None, **options):
+    """Exporta la salida tabular de `function` a `path`; devuelve el nombre base sugerido."""
+    if fmt not in WRITERS:
+        raise ExportError(f"Unknown format '{fmt}'. Formats: {', '.join(WRITERS)}")
+    name, chunks = SOURCES[function](context, **options)
+    # Sin filas no hay encabezado ni esquema que escribir: se avisa en lugar de dejar un archivo vacío
+    first = next(chunks, None)
+    if first is None:
+        raise ExportError("No rows to export")
+    WRITERS[fmt](path, itertools.chain([first], chunks), progress)
+    return name
+
+
+# -------------------------------
+# TRABAJOS EN SEGUNDO PLANO
+# -------------------------------
+class ExportJob:
+
+    def __init__(self, function, context, fmt, options):
+        self.id = uuid.uuid4().hex[:12]
+        self.function = function
+        self.context = context
+        self.fmt = fmt
+        self.options = options
+        self.rows = 0
+        self.status = "running"
+        self.error = None
+        self.path = None
+        self.filename = None
+        self.started = time.time()
+        self.finished = None
+        self._tmp = None
+
+    def _progress(self, n):
+        self.rows += n
+        # Se corta al pasar el límite (a lo sumo un bloque de más) en lugar de dejar un link roto
+        if os.path.getsize(self._tmp) > MAX_FILE_BYTES:
+            hint = "" if self.fmt == "parquet" else " or use Parquet"
+            raise ExportError(f"Export exceeds {MAX_FILE_BYTES >> 20} MB after {self.rows:,} rows; "
+                              f"request fewer rows{hint}")
+
+    def run(self, directory):
+        tmp = self._tmp = os.path.join(directory, f"export.{self.fmt}.part")
+        try:
+            name = export(self.function, self.context, self.fmt, tmp, self._progress, **self.options)
+            self.filename = "".join(c if c.isalnum() or c in "-_" else "_" for c in name) + f".{self.fmt}"
+            self.path = os.path.join(directory, self.filename)
+            os.replace(tmp, self.path)
+            self.status = "done"
+        except Exception as exc:
+            self.error = str(exc) if isinstance(exc, ExportError) else f"{type(exc).__name__}: {exc}"
+            self.status = "failed"
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        finally:
+            self.finished = time.time()
+
+    @property
+    def url(self):
+        """Ruta relativa servida por Streamlit desde static/ (enableStaticServing)."""
+        return f"app/static/exports/{self.id}/{self.filename}"
+
+
+class ExportManager:
+
+    def __init__(self, directory=EXPORT_DIR, workers=2, ttl=EXPORT_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="xltp")
+
+    def submit(self, function, context, fmt, **options):
+        self._purge()
+        job = ExportJob(function, context, fmt, options)
+        directory = os.path.join(self.directory, job.id)
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._pool.submit(job.run, directory)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _purge(self):
+        # Archivos y trabajos vencidos: se borran al encolar uno nuevo
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [j for j, job in self._jobs.items() if job.finished and job.finished < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+            live = set(self._jobs)
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name not in live and entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def get_manager():
+    return resources.shared("export_manager", ExportManager)
+
+
+# -------------------------------
+# CLI
+# -------------------------------
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Export a function's tabular output.")
+    parser.add_argument("function", choices=sorted(SOURCES))
+    parser.add_argument("context", nargs="?")
+    parser.add_argument("rows", nargs="?", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("-f", "--format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("-o", "--output", required=True)
+    args = parser.parse_args()
+
+    options = {"rows": args.rows} if args.function in ("BGN", "BVAL", "BT") else {}
+    start = time.perf_counter()
+    rows = [0]
+    try:
+        export(args.function, args.context, args.format, args.output,
+               lambda n: rows.__setitem__(0, rows[0] + n), **options)
+    except ExportError as exc:
+        sys.exit(str(exc))
+    print(f"{rows[0]:,} rows -> {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB) "
+          f"in {time.perf_counter() - start:.2f} s", file=sys.stderr)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Hazard-rate bootstrapping for implied probability-of-default curves (MIPD)
+
+Aproximación de "credit triangle" por tramos: el spread par s(T) implica
+una intensidad media λ̄(T) = s(T) / (1 - R). Con hazard constante por tramo,
+λ̄(T_k)·T_k = Σ λ_j·Δ_j, de modo que cada tramo se obtiene de la diferencia
+de intensidades acumuladas: el bootstrap completo es un np.diff sobre la
+matriz (emisores x horizontes). PD(T) = 1 - exp(-Σ λ_j·Δ_j).
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_RECOVERY = 0.40
+DEFAULT_HORIZONS = np.array([1.0, 2.0, 3.0, 5.0, 7.0, 10.0])
+
+
+# -------------------------------
+# BOOTSTRAP VECTORIZADO
+# -------------------------------
+def bootstrap(spreads_bps, horizons=DEFAULT_HORIZONS, recovery=DEFAULT_RECOVERY):
+    """Hazard por tramo (emisores x horizontes) a partir de spreads en bps.
+
+    `recovery` puede ser escalar o un vector por emisor. Si la curva de
+    spreads invierte lo bastante como para implicar un hazard negativo en
+    algún tramo, ese tramo se trunca a cero (PD acumulada no decreciente).
+    """
+    s = np.atleast_2d(np.asarray(spreads_bps, dtype=float)) / 1e4
+    horizons = np.asarray(horizons, dtype=float)
+    lgd = 1.0 - np.asarray(recovery, dtype=float).reshape(-1, 1)
+    cumulative = s / lgd * horizons
+    increments = np.diff(cumulative, axis=1, prepend=0.0)
+    np.maximum(increments, 0.0, out=increments)
+    return increments / np.diff(horizons, prepend=0.0)
+
+
+def default_probabilities(hazards, horizons=DEFAULT_HORIZONS):
+    """PD acumulada y PD marginal por tramo."""
+    dt = np.diff(np.asarray(horizons, dtype=float), prepend=0.0)
+    survival = np.exp(-np.cumsum(hazards * dt, axis=1))
+    cumulative = 1.0 - survival
+    marginal = np.diff(cumulative, axis=1, prepend=0.0)
+    return cumulative, marginal
+
+
+def pd_surface(spreads_bps, horizons=DEFAULT_HORIZONS, recovery=DEFAULT_RECOVERY):
+    """Modo bulk: hazards y PDs de todo un universo en una pasada."""
+    hazards = bootstrap(spreads_bps, horizons, recovery)
+    cumulative, marginal = default_probabilities(hazards, horizons)
+    return {"horizons": np.asarray(horizons, dtype=float), "hazard": hazards,
+            "pd": cumulative, "marginal_pd": marginal}
+
+
+# -------------------------------
+# MEMO POR (EMISOR, FECHA, RECOVERY)
+# -------------------------------
+class PDCurveCache:
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, issuers, as_of, recovery, spreads_fn, horizons=DEFAULT_HORIZONS):
+        """Curvas por emisor; solo se bootstrappean los que no están en cache, todos juntos.
+
+        `spreads_fn(issuers_faltantes)` devuelve su matriz de spreads en bps.
+        """
+        horizons = tuple(float(h) for h in horizons)
+        keys = [(issuer, as_of, recovery, horizons) for issuer in issuers]
+        with self._lock:
+            missing = [k for k in dict.fromkeys(keys) if k not in self._data]
+        if missing:
+            names = [k[0] for k in missing]
+            surface = pd_surface(spreads_fn(names), np.array(horizons), recovery)
+            with self._lock:
+                for i, key in enumerate(missing):
+                    self._data[key] = {name: v[i] for name, v in surface.items() if name != "horizons"}
+                while len(self._data) > self.max_entries:
+                    self._data.popitem(last=False)
+        out = []
+        with self._lock:
+            for key in keys:
+                # Si la entrada fue desalojada entre medio, se recalcula sola
+                curve = self._data.get(key)
+                if curve is not None:
+                    self._data.move_to_end(key)
+                out.append(curve)
+        for i, curve in enumerate(out):
+            if curve is None:
+                out[i] = self.get_many([issuers[i]], as_of, recovery, spreads_fn, horizons)[0]
+        return out
+
+    def get(self, issuer, as_of, recovery, spreads_fn, horizons=DEFAULT_HORIZONS):
+        return self.get_many([issuer], as_of, recovery, spreads_fn, horizons)[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+PD_CACHE = PDCurveCache()
+
+
+# -------------------------------
+# CLI: superficie de PD para el batch de riesgo
+# -------------------------------
+if __name__ == "__main__":
+    import argparse
+    import csv
+    import sys
+
+    import marketdata
+
+    parser = argparse.ArgumentParser(description="Bootstrap PD surfaces for a credit universe.")
+    parser.add_argument("issuers", help="File with one issuer per line ('-' for stdin)")
+    parser.add_argument("-r", "--recovery", type=float, default=DEFAULT_RECOVERY)
+    parser.add_argument("-o", "--output", help="CSV output (default: stdout)")
+    args = parser.parse_args()
+
+    src = sys.stdin if args.issuers == "-" else open(args.issuers, encoding="utf-8")
+    with src:
+        issuers = [line.strip() for line in src if line.strip()]
+
+    surface = pd_surface(marketdata.term_structure("spread", issuers, DEFAULT_HORIZONS),
+                         DEFAULT_HORIZONS, args.recovery)
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    writer = csv.writer(out)
+    writer.writerow(["issuer"] + [f"pd_{h:g}y" for h in DEFAULT_HORIZONS]
+                    + [f"hazard_{h:g}y" for h in DEFAULT_HORIZONS])
+    for issuer, pd_row, hz_row in zip(issuers, surface["pd"], surface["hazard"]):
+        writer.writerow([issuer] + [f"{v:.6f}" for v in pd_row] + [f"{v:.6f}" for v in hz_row])
+    if out is not sys.stdout:
+        out.close()
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized technical indicators (SMA, EMA, RSI, MACD, Bollinger, ATR, VWAP)
+
+Todas las funciones trabajan sobre el último eje: un vector (barras) o una
+matriz (tickers x barras). Cada una recibe un `state` opcional y devuelve
+(resultado, nuevo_state); con state=None calcula la historia completa y con
+el state anterior procesa solo las barras nuevas.
+"""
+import numpy as np
+
+# Exponente máximo del factor de escala en el kernel EMA por bloques
+_EWM_LOG_LIMIT = 40.0
+
+
+# -------------------------------
+# KERNELS
+# -------------------------------
+def _as_2d(x):
+    x = np.asarray(x, dtype=float)
+    return x.reshape(1, -1) if x.ndim == 1 else x
+
+
+def _like(out, x):
+    return out[0] if np.ndim(x) == 1 else out
+
+
+def _ewm(x, alpha, init):
+    """y_t = (1 - alpha) * y_{t-1} + alpha * x_t con y_{-1} = init, en bloques de cumsum: O(n)."""
+    if alpha == 1.0:
+        # Sin memoria (span=1, window=1): y_t = x_t
+        return x.copy()
+    n, length = x.shape
+    out = np.empty_like(x)
+    decay = 1.0 - alpha
+    block = max(1, min(length, int(_EWM_LOG_LIMIT / -np.log(decay))))
+    scale = decay ** -np.arange(1, block + 1)
+    prev = np.asarray(init, dtype=float).reshape(n)
+    for start in range(0, length, block):
+        stop = min(start + block, length)
+        p = scale[:stop - start]
+        acc = np.cumsum(x[:, start:stop] * p, axis=1)
+        acc *= alpha
+        acc += prev[:, None]
+        acc /= p
+        out[:, start:stop] = acc
+        prev = acc[:, -1]
+    return out
+
+
+def _rolling_sums(x, window):
+    """Sumas móviles de x y x² (desplazadas por el primer valor para estabilidad numérica)."""
+    shift = x[:, :1]
+    z = x - shift
+    c1 = np.zeros((x.shape[0], x.shape[1] + 1))
+    c2 = np.zeros_like(c1)
+    np.cumsum(z, axis=1, out=c1[:, 1:])
+    np.cumsum(z * z, axis=1, out=c2[:, 1:])
+    return c1[:, window:] - c1[:, :-window], c2[:, window:] - c2[:, :-window], shift
+
+
+def _with_tail(x, tail):
+    return x if tail is None else np.concatenate([tail, x], axis=1)
+
+
+def _pad(values, length):
+    out = np.full((values.shape[0], length), np.nan)
+    if values.shape[1]:
+        out[:, length - values.shape[1]:] = values[:, -length:]
+    return out
+
+
+# -------------------------------
+# INDICADORES
+# -------------------------------
+def sma(close, window=20, state=None):
+    x = _as_2d(close)
+    xx = _with_tail(x, state)
+    length = x.shape[1]
+    if xx.shape[1] >= window:
+        s1, _, shift = _rolling_sums(xx, window)
+        out = _pad(s1 / window + shift, length)
+    else:
+        out = np.full_like(x, np.nan)
+    return _like(out, close), xx[:, -(window - 1):] if window > 1 else xx[:, :0]
+
+
+def ema(close, span=20, state=None):
+    x = _as_2d(close)
+    init = x[:, 0] if state is None else state
+    out = _ewm(x, 2.0 / (span + 1), init)
+    return _like(out, close), out[:, -1].copy()
+
+
+def bollinger(close, window=20, k=2.0, state=None):
+    x = _as_2d(close)
+    xx = _with_tail(x, state)
+    length = x.shape[1]
+    if xx.shape[1] >= window:
+        s1, s2, shift = _rolling_sums(xx, window)
+        mean = s1 / window
+        std = np.sqrt(np.maximum(s2 / window - mean * mean, 0.0))
+        mid = _pad(mean + shift, length)
+        width = _pad(k * std, length)
+    else:
+        mid = width = np.full_like(x, np.nan)
+    bands = {"bb_upper": mid + width, "bb_mid": mid, "bb_lower": mid - width}
+    new_state = xx[:, -(window - 1):] if window > 1 else xx[:, :0]
+    return {name: _like(v, close) for name, v in bands.items()}, new_state
+
+
+def rsi(close, window=14, state=None):
+    """RSI de Wilder; state = (último cierre, avg_gain, avg_loss, barras vistas)."""
+    x = _as_2d(close)
+    n = x.shape[0]
+    alpha = 1.0 / window
+    if state is None:
+        prev_close, gain0, loss0, seen = x[:, 0], None, None, 0
+    else:
+        prev_close, gain0, loss0, seen = state
+    delta = np.diff(np.concatenate([prev_close[:, None], x], axis=1), axis=1)
+    gain = np.maximum(delta, 0.0)
+    loss = np.maximum(-delta, 0.0)
+    if gain0 is None:
+        # La primera barra no tiene variación: arranca en cero
+        gain0, loss0 = np.zeros(n), np.zeros(n)
+    avg_gain = _ewm(gain, alpha, gain0)
+    avg_loss = _ewm(loss, alpha, loss0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    out[avg_loss == 0] = 100.0
+    bar = seen + np.arange(x.shape[1])
+    out[:, bar < window] = np.nan
+    new_state = (x[:, -1].copy(), avg_gain[:, -1].copy(), avg_loss[:, -1].copy(), seen + x.shape[1])
+    return _like(out, close), new_state
+
+
+def macd(close, fast=12, slow=26, signal=9, state=None):
+    x = _as_2d(close)
+    fast_state, slow_state, signal_state = state if state is not None else (None, None, None)
+    ema_fast, fast_state = ema(x, fast, fast_state)
+    ema_slow, slow_state = ema(x, slow, slow_state)
+    line = ema_fast - ema_slow
+    sig, signal_state = ema(line, signal, signal_state)
+    out = {"macd": line, "macd_signal": sig, "macd_hist": line - sig}
+    return {name: _like(v, close) for name, v in out.items()}, (fast_state, slow_state, signal_state)
+
+
+def atr(high, low, close, window=14, state=None):
+    """Average True Range de Wilder; state = (último cierre, atr, barras vistas)."""
+    h, l, c = _as_2d(high), _as_2d(low), _as_2d(close)
+    if state is None:
+        prev_close, atr0, seen = c[:, 0], None, 0
+    else:
+        prev_close, atr0, seen = state
+    prev = np.concatenate([prev_close[:, None], c[:, :-1]], axis=1)
+    tr = np.maximum(h - l, np.maximum(np.abs(h - prev), np.abs(l - prev)))
+    out = _ewm(tr, 1.0 / window, tr[:, 0] if atr0 is None else atr0)
+    last = out[:, -1].copy()
+    out[:, seen + np.arange(c.shape[1]) < window - 1] = np.nan
+    return _like(out, close), (c[:, -1].copy(), last, seen + c.shape[1])
+
+
+def vwap(high, low, close, volume, state=None):
+    """VWAP acumulado sobre precio típico; state = (Σ precio·volumen, Σ volumen)."""
+    h, l, c, v = _as_2d(high), _as_2d(low), _as_2d(close), _as_2d(volume)
+    pv = (h + l + c) / 3.0 * v
+    cum_pv = np.cumsum(pv, axis=1)
+    cum_v = np.cumsum(v, axis=1)
+    if state is not None:
+        cum_pv += state[0][:, None]
+        cum_v += state[1][:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = cum_pv / cum_v
+    return _like(out, close), (cum_pv[:, -1].copy(), cum_v[:, -1].copy())
+
+
+# -------------------------------
+# ENGINE INCREMENTAL
+# -------------------------------
+DEFAULT_PARAMS = {
+    "sma": {"window": 20},
+    "ema": {"span": 20},
+    "rsi": {"window": 14},
+    "macd": {"fast": 12, "slow": 26, "signal": 9},
+    "bollinger": {"window": 20, "k": 2.0},
+    "atr": {"window": 14},
+    "vwap": {},
+}
+
+# Indicadores en escala de precio (se superponen) vs osciladores (panel aparte)
+OVERLAYS = ("sma", "ema", "bollinger", "vwap")
+OSCILLATORS = ("rsi", "macd", "atr")
+
+
+class IndicatorEngine:
+    """Mantiene el estado de cada indicador: `update` con barras nuevas no recalcula la historia."""
+
+    def __init__(self, names=tuple(DEFAULT_PARAMS), **params):
+        unknown = set(names) - set(DEFAULT_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown indicators: {sorted(unknown)}")
+        self.names = tuple(names)
+        self.params = {name: {**DEFAULT_PARAMS[name], **params.get(name, {})} for name in self.names}
+        self._state = dict.fromkeys(self.names)
+        self._chunks = {}
+
+    def update(self, close, high=None, low=None, volume=None):
+        """Procesa barras nuevas (tickers x barras) y devuelve los valores de esas barras."""
+        out = {}
+        for name in self.names:
+            p, state = self.params[name], self._state[name]
+            if name in ("atr", "vwap") and (high is None or low is None):
+                raise ValueError(f"{name} needs high and low prices")
+            if name == "atr":
+                values, state = atr(high, low, close, state=state, **p)
+            elif name == "vwap":
+                if volume is None:
+                    raise ValueError("vwap needs volume")
+                values, state = vwap(high, low, close, volume, state=state)
+            else:
+                values, state = globals()[name](close, state=state, **p)
+            self._state[name] = state
+            if not isinstance(values, dict):
+                values = {name: values}
+            out.update(values)
+        for key, values in out.items():
+            self._chunks.setdefault(key, []).append(values)
+        return out
+
+    def history(self, key):
+        chunks = self._chunks[key]
+        if len(chunks) > 1:
+            self._chunks[key] = [np.concatenate(chunks, axis=-1)]
+        return self._chunks[key][0]
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent command journal (SQLite, WAL)
+
+Usage:
+    python journal.py sessions
+    python journal.py export [--session S] [--function F] [-o out.csv]
+    python journal.py replay SESSION
+
+Cada <GO> se encola y un único hilo escritor lo vuelca en lotes
+(executemany en una transacción). Con WAL los lectores (HIST, export,
+replay) no bloquean al escritor. Las lecturas largas paginan por id, así
+que exportar millones de filas usa memoria constante y no retiene una
+transacción de lectura abierta.
+"""
+import csv
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import resources
+
+JOURNAL_PATH = os.environ.get("BBG_JOURNAL", "journal.db")
+# Respaldo si no se puede abrir JOURNAL_PATH (directorio de solo lectura): base compartida en memoria
+MEMORY_PATH = "file:bbg-journal?mode=memory&cache=shared"
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.2
+FLUSH_TIMEOUT = 5.0
+EXPORT_CHUNK = 10_000
+HIST_LIMIT = 50
+
+COLUMNS = ("id", "session", "ts", "command", "function", "context", "status", "latency_ms")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS commands (
+    id         INTEGER PRIMARY KEY,
+    session    TEXT NOT NULL,
+    ts         REAL NOT NULL,
+    command    TEXT NOT NULL,
+    function   TEXT,
+    context    TEXT,
+    status     TEXT,
+    latency_ms REAL
+);
+CREATE INDEX IF NOT EXISTS ix_commands_session ON commands (session, ts);
+CREATE INDEX IF NOT EXISTS ix_commands_function ON commands (function, ts);
+CREATE INDEX IF NOT EXISTS ix_commands_ts ON commands (ts);
+"""
+
+
+log = logging.getLogger(__name__)
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False, uri=path.startswith("file:"))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _where(session=None, function=None, status=None, since=None, until=None):
+    clauses, params = [], []
+    for column, value in (("session", session), ("function", function), ("status", status)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if since is not None:
+        clauses.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("ts < ?")
+        params.append(until)
+    return clauses, params
+
+
+# -------------------------------
+# JOURNAL
+# -------------------------------
+class Journal:
+
+    def __init__(self, path=JOURNAL_PATH, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        # Queda abierta: una base en memoria existe mientras tenga alguna conexión
+        self._conn = _connect(path)
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._write_loop, name="journal-writer", daemon=True)
+        self._thread.start()
+
+    # Escritura: un solo hilo, lotes de hasta batch_size filas
+    def _write_loop(self):
+        conn = None
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                if conn is None:
+                    conn = _connect(self.path)
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO commands (session, ts, command, function, context, status, latency_ms) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+            except sqlite3.Error as exc:
+                # Base bloqueada, disco lleno o valor no enlazable: se pierde el lote, no el hilo
+                self.dropped += len(batch)
+                log.warning("journal: dropped %d commands: %s", len(batch), exc)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def record(self, session, result, latency_ms=None, ts=None):
+        """Encola un CommandResult; no bloquea al llamador."""
+        self._queue.put((session, time.time() if ts is None else ts, result.command, result.function,
+                         result.context, result.status, latency_ms))
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """Espera a que se vuelque lo encolado; False si no terminó en `timeout` segundos."""
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    # Lectura: conexión propia por llamada (WAL permite lectores concurrentes)
+    def recall(self, limit=HIST_LIMIT, **filters):
+        """Últimos `limit` comandos que cumplen los filtros, del más reciente al más viejo."""
+        clauses, params = _where(**filters)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM commands"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        conn = _connect(self.path)
+        try:
+            rows = conn.execute(sql + " ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+        finally:
+            conn.close()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def iter_rows(self, chunk=EXPORT_CHUNK, **filters):
+        """Todas las filas en orden de inserción, paginando por id (memoria constante)."""
+        clauses, params = _where(**filters)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM commands WHERE " + " AND ".join(clauses + ["id > ?"])
+        sql += " ORDER BY id LIMIT ?"
+        conn = _connect(self.path)
+        try:
+            last = 0
+            while True:
+                rows = conn.execute(sql, params + [last, chunk]).fetchall()
+                if not rows:
+                    return
+                for row in rows:
+                    yield row
+                last = rows[-1][0]
+        finally:
+            conn.close()
+
+    def export_csv(self, out, chunk=EXPORT_CHUNK, **filters):
+        writer = csv.writer(out)
+        writer.writerow(COLUMNS)
+        n = 0
+        for row in self.iter_rows(chunk, **filters):
+            writer.writerow(row)
+            n += 1
+        return n
+
+    def sessions(self, limit=HIST_LIMIT):
+        conn = _connect(self.path)
+        try:
+            return conn.execute(
+                "SELECT session, COUNT(*), MIN(ts), MAX(ts) FROM commands "
+                "GROUP BY session ORDER BY MAX(ts) DESC LIMIT ?", (limit,)).fetchall()
+        finally:
+            conn.close()
+
+    def replay(self, session, execute=None):
+        """Re-ejecuta los comandos de una sesión en orden; produce (fila, resultado nuevo)."""
+        if execute is None:
+            from engine import execute
+        for row in self.iter_rows(session=session):
+            row = dict(zip(COLUMNS, row))
+            yield row, execute(row["command"])
+
+
+def _open():
+    try:
+        return Journal()
+    except (sqlite3.Error, OSError) as exc:
+        # Como la KB en un directorio de solo lectura: el historial sigue funcionando, solo en memoria
+        log.warning("journal: cannot open %s (%s); keeping history in memory", JOURNAL_PATH, exc)
+        return Journal(MEMORY_PATH)
+
+
+def get_journal():
+    return resources.shared("journal", _open)
+
+
+# -------------------------------
+# FILTROS DE HIST <GO>
+# -------------------------------
+# HIST <GO>            -> comandos de esta sesión
+# HIST BGN <GO>        -> solo la función BGN
+# HIST ALL [BGN] <GO>  -> todas las sesiones
+# HIST REPLAY <GO>     -> re-ejecuta esta sesión y compara el status
+def parse_filter(query, session):
+    words = (query or "").upper().split()
+    filters = {"session": session}
+    replay = "REPLAY" in words
+    if "ALL" in words:
+        filters["session"] = None
+    rest = [w for w in words if w not in ("ALL", "REPLAY")]
+    if rest:
+        filters["function"] = rest[0]
+    return filters, replay
+
+
+# -------------------------------
+# CLI
+# -------------------------------
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Inspect, export or replay the command journal.")
+    parser.add_argument("--db", default=JOURNAL_PATH)
+    sub = parser.add_subparsers(dest="action", required=True)
+    sub.add_parser("sessions")
+    exp = sub.add_parser("export")
+    exp.add_argument("--session")
+    exp.add_argument("--function")
+    exp.add_argument("--status")
+    exp.add_argument("-o", "--output", help="CSV output (default: stdout)")
+    rep = sub.add_parser("replay")
+    rep.add_argument("session")
+    args = parser.parse_args()
+
+    journal = Journal(args.db)
+    if args.action == "sessions":
+        for session, n, first, last in journal.sessions():
+            print(f"{session}  {n:>7}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(first))}"
+                  f" .. {time.strftime('%Y-%m-%d %H:%M', time.localtime(last))}")
+    elif args.action == "export":
+        out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+        n = journal.export_csv(out, session=args.session, function=args.function, status=args.status)
+        if out is not sys.stdout:
+            out.close()
+        print(f"{n} rows exported", file=sys.stderr)
+    else:
+        mismatches = 0
+        for row, result in journal.replay(args.session):
+            ok = row["status"] == result.status
+            mismatches += not ok
+            print(f"{'ok ' if ok else 'DIFF'} {row['command']:<40} {row['status']} -> {result.status}")
+        sys.exit(1 if mismatches else 0)
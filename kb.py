@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Bloomberg function knowledge base
+
+La fuente es data/functions.json (versionada). `python kb.py build` la valida
+y la compila a data/functions.kb: un índice de offsets + entradas serializadas
+que se abre con mmap y se decodifica entrada por entrada al consultarla.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+
+import resources
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+KB_SOURCE = os.path.join(DATA_DIR, "functions.json")
+KB_COMPILED = os.path.join(DATA_DIR, "functions.kb")
+
+MAGIC = b"BBGKB\x01"
+_HEADER = struct.Struct("<6s32sI")
+
+REQUIRED_FIELDS = {
+    "purpose": str,
+    "universe": str,
+    "output": str,
+    "assumptions": str,
+    "not_applicable": list,
+    "chart": (str, type(None)),
+}
+
+# Tipos de gráfico que implementa charts.RENDERERS. Se listan aquí para validar sin importar
+# charts (numpy + matplotlib) al arrancar; `python kb.py build` verifica que coincidan.
+CHART_TYPES = frozenset({
+    "credit_curve", "credit_market", "pd_curve", "portfolio_attribution",
+    "price_compare", "rate_curve", "rrg_quadrant", "technical_price",
+})
+
+
+class KnowledgeBaseError(ValueError):
+    pass
+
+
+# -------------------------------
+# VALIDACIÓN
+# -------------------------------
+def _reject_duplicates(pairs):
+    seen = {}
+    for key, value in pairs:
+        if key in seen:
+            raise KnowledgeBaseError(f"Duplicate key: {key}")
+        seen[key] = value
+    return seen
+
+
+def validate(data, chart_types=CHART_TYPES):
+    if "version" not in data or not isinstance(data.get("functions"), dict):
+        raise KnowledgeBaseError("Knowledge base needs 'version' and 'functions'")
+
+    errors = []
+    for mnemonic, entry in data["functions"].items():
+        if mnemonic != mnemonic.upper() or not mnemonic.isalnum():
+            errors.append(f"{mnemonic}: mnemonic must be upper-case alphanumeric")
+        for name, kind in REQUIRED_FIELDS.items():
+            if name not in entry:
+                errors.append(f"{mnemonic}: missing field '{name}'")
+            elif not isinstance(entry[name], kind):
+                errors.append(f"{mnemonic}: field '{name}' has wrong type")
+        unknown = set(entry) - set(REQUIRED_FIELDS)
+        if unknown:
+            errors.append(f"{mnemonic}: unknown fields {sorted(unknown)}")
+        chart = entry.get("chart")
+        if chart is not None and chart not in chart_types:
+            errors.append(f"{mnemonic}: unknown chart type '{chart}'")
+    if errors:
+        raise KnowledgeBaseError("\n".join(errors))
+
+
+def load_source(path=KB_SOURCE):
+    with open(path, "rb") as f:
+        raw = f.read()
+    return raw, json.loads(raw.decode("utf-8"), object_pairs_hook=_reject_duplicates)
+
+
+# -------------------------------
+# COMPILACIÓN
+# -------------------------------
+def compile_kb(data, source_digest):
+    blobs = []
+    index = {}
+    offset = 0
+    for mnemonic, entry in data["functions"].items():
+        blob = json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        index[mnemonic] = (offset, len(blob))
+        blobs.append(blob)
+        offset += len(blob)
+    header = json.dumps({"version": data["version"], "index": index}, separators=(",", ":")).encode("utf-8")
+    return _HEADER.pack(MAGIC, source_digest, len(header)) + header + b"".join(blobs)
+
+
+def build(source=KB_SOURCE, target=KB_COMPILED, chart_types=CHART_TYPES):
+    raw, data = load_source(source)
+    validate(data, chart_types)
+    payload = compile_kb(data, hashlib.sha256(raw).digest())
+    # Temporal único por proceso: varios procesos pueden compilar a la vez en un árbol nuevo
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".functions-", suffix=".kb.tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, target)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return data
+
+
+# -------------------------------
+# CARGA PEREZOSA
+# -------------------------------
+class KnowledgeBase(Mapping):
+    """Mapping de solo lectura: las entradas se decodifican al primer acceso."""
+
+    def __init__(self, buffer):
+        magic, self.source_digest, header_len = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise KnowledgeBaseError("Not a compiled knowledge base")
+        start = _HEADER.size
+        header = json.loads(bytes(buffer[start:start + header_len]).decode("utf-8"))
+        self.version = header["version"]
+        self._index = header["index"]
+        self._base = start + header_len
+        self._buffer = buffer
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path=KB_COMPILED):
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __getitem__(self, mnemonic):
+        entry = self._entries.get(mnemonic)
+        if entry is not None:
+            return entry
+        offset, length = self._index[mnemonic]
+        start = self._base + offset
+        entry = json.loads(bytes(self._buffer[start:start + length]).decode("utf-8"))
+        # Compartida entre sesiones: se entrega de solo lectura
+        entry["not_applicable"] = tuple(entry["not_applicable"])
+        entry = MappingProxyType(entry)
+        with self._lock:
+            return self._entries.setdefault(mnemonic, entry)
+
+    def __contains__(self, mnemonic):
+        return mnemonic in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def close(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+
+def _source_digest(path=KB_SOURCE):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).digest()
+
+
+def load():
+    """Abre el binario compilado; lo recompila si falta o no corresponde a la fuente."""
+    if os.path.exists(KB_COMPILED):
+        kb = KnowledgeBase.open(KB_COMPILED)
+        if not os.path.exists(KB_SOURCE) or kb.source_digest == _source_digest():
+            return kb
+        kb.close()
+    try:
+        build()
+        return KnowledgeBase.open(KB_COMPILED)
+    except OSError:
+        # Directorio de solo lectura: se compila en memoria
+        raw, data = load_source()
+        validate(data)
+        return KnowledgeBase(compile_kb(data, hashlib.sha256(raw).digest()))
+
+
+# Recurso por proceso: compartido por todas las sesiones y reruns
+def get_kb():
+    return resources.shared("kb", load)
+
+
+def __getattr__(name):
+    if name == "FUNCTION_KB":
+        return get_kb()
+    if name == "KB_VERSION":
+        return get_kb().version
+    raise AttributeError(f"module 'kb' has no attribute {name!r}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] not in (["build"], []):
+        sys.exit("usage: python kb.py [build]")
+    from charts import RENDERERS
+
+    if set(RENDERERS) != CHART_TYPES:
+        sys.exit(f"kb.CHART_TYPES is out of sync with charts.RENDERERS: "
+                 f"{sorted(CHART_TYPES ^ set(RENDERERS))}")
+    try:
+        data = build(chart_types=RENDERERS)
+    except KnowledgeBaseError as exc:
+        sys.exit(f"Knowledge base validation failed:\n{exc}")
+    print(f"Compiled {len(data['functions'])} functions (version {data['version']}) to {KB_COMPILED}")
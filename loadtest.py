@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-session load-test harness
+
+Usage:
+    python loadtest.py [--sessions 1,8,32] [--commands 50] [--think-ms 0] [--mode threads|apptest] [--json]
+
+Modo "threads": N sesiones concurrentes en este proceso recorren el mismo
+camino que app.py en cada <GO> (engine -> panel HTML -> gráfico -> quotes),
+compartiendo KB, índices y caches como en un servidor Streamlit real.
+Modo "apptest": cada sesión es un AppTest de Streamlit (script completo en
+cada rerun) en su propio proceso; AppTest no es thread-safe.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# -------------------------------
+# MEZCLA DE COMANDOS
+# -------------------------------
+TICKERS = [f"{name} {suffix}" for name in ("IBM", "AAPL", "MSFT", "PEMEX", "YPF", "PETR4", "CEMEX", "BBVA",
+                                           "SAN", "AMXL", "GGAL", "BAP", "ECOPETL", "FALAB", "SQM")
+           for suffix in ("US", "Equity", "Corp")]
+SEARCH_QUERIES = ["default probability", "bonos soberanos", "curvas de crédito", "exportar excel",
+                  "technical indicators", "noticias", "rating changes", "portfolio attribution"]
+
+# (peso, tipo de comando)
+COMMAND_MIX = (
+    (0.45, "documented"),
+    (0.20, "chart"),
+    (0.10, "search"),
+    (0.10, "global"),
+    (0.10, "typo"),
+    (0.05, "undocumented"),
+)
+
+
+def command_mix(n, seed=0):
+    """Corpus de comandos reproducible con la mezcla típica de una clase."""
+    from kb import FUNCTION_KB
+
+    rng = random.Random(seed)
+    mnemonics = sorted(FUNCTION_KB)
+    charted = [m for m in mnemonics if FUNCTION_KB[m]["chart"]]
+    weights, kinds = zip(*COMMAND_MIX)
+    out = []
+    for kind in rng.choices(kinds, weights, k=n):
+        ticker = rng.choice(TICKERS)
+        if kind == "documented":
+            out.append(f"{ticker} {rng.choice(mnemonics)} <GO>")
+        elif kind == "chart":
+            out.append(f"{ticker} {rng.choice(charted)} <GO>")
+        elif kind == "search":
+            out.append(f"SEARCH {rng.choice(SEARCH_QUERIES)} <GO>")
+        elif kind == "global":
+            out.append(f"{rng.choice(mnemonics)} <GO>")
+        elif kind == "typo":
+            m = list(rng.choice(mnemonics))
+            if len(m) > 1:
+                i = rng.randrange(len(m) - 1)
+                m[i], m[i + 1] = m[i + 1], m[i]
+            out.append(f"{ticker} {''.join(m)} <GO>")
+        else:
+            out.append(f"{ticker} ZZ{rng.randrange(100)} <GO>")
+    return out
+
+
+# -------------------------------
+# MÉTRICAS
+# -------------------------------
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentiles(values, qs=(50, 95, 99)):
+    values = sorted(values)
+    if not values:
+        return {f"p{q}": None for q in qs}
+    return {f"p{q}": round(values[min(len(values) - 1, int(len(values) * q / 100))], 3) for q in qs}
+
+
+# -------------------------------
+# SESIÓN HEADLESS (MISMO CAMINO QUE app.py)
+# -------------------------------
+def handle(command, indicators=("sma", "bollinger"), recovery=0.4):
+    import engine
+    import panels
+    import perf
+
+    trace = perf.CommandTrace(command)
+    result = engine.execute(command, trace)
+    trace.function, trace.status = result.function, result.status
+    stages = result.stages or [result]
+
+    def options_for(stage):
+        if stage.chart == "technical_price":
+            return {"indicators": indicators}
+        if stage.chart == "pd_curve":
+            return {"recovery": recovery}
+        return {}
+
+    with trace.stage("html"):
+        for stage in [result] + result.stages:
+            panels.output_html(stage)
+    if any(stage.chart is not None for stage in stages):
+        with trace.stage("chart"):
+            import pipeline
+            for _ in pipeline.run(stages, options_for):
+                pass
+    if any(stage.live for stage in stages):
+        with trace.stage("quotes"):
+            from quotes import get_feed
+            for context in {stage.context for stage in stages if stage.live}:
+                get_feed().read(context)
+    trace.finish()
+    return result
+
+
+def _thread_session(args):
+    commands, think = args
+    latencies = []
+    for command in commands:
+        start = time.perf_counter()
+        handle(command)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if think:
+            time.sleep(think)
+    return latencies
+
+
+def _apptest_session(args):
+    commands, think = args
+    from streamlit.testing.v1 import AppTest
+
+    base = rss_mb()
+    at = AppTest.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py"),
+                           default_timeout=120).run()
+    latencies = []
+    for command in commands:
+        at.text_input[0].input(command)
+        at.button[0].click()
+        start = time.perf_counter()
+        at.run()
+        latencies.append((time.perf_counter() - start) * 1000)
+        if at.exception:
+            raise RuntimeError(f"{command}: {at.exception}")
+        if think:
+            time.sleep(think)
+    return latencies, rss_mb() - base
+
+
+def run_level(sessions, commands_per_session, think_ms=0, mode="threads", seed=0):
+    corpus = command_mix(sessions * commands_per_session, seed)
+    work = [(corpus[i::sessions], think_ms / 1000) for i in range(sessions)]
+
+    if mode == "threads":
+        import resources
+        resources.warm_up()
+        base = rss_mb()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(sessions) as pool:
+            per_session = list(pool.map(_thread_session, work))
+        elapsed = time.perf_counter() - start
+        mem_per_session = (rss_mb() - base) / sessions
+    else:
+        start = time.perf_counter()
+        with ProcessPoolExecutor(sessions) as pool:
+            results = list(pool.map(_apptest_session, work))
+        elapsed = time.perf_counter() - start
+        per_session = [r[0] for r in results]
+        mem_per_session = sum(r[1] for r in results) / sessions
+
+    latencies = [lat for session in per_session for lat in session]
+    return {
+        "sessions": sessions,
+        "commands": len(latencies),
+        "seconds": round(elapsed, 3),
+        "throughput_cps": round(len(latencies) / elapsed, 1),
+        "latency_ms": percentiles(latencies),
+        "mem_per_session_mb": round(mem_per_session, 2),
+    }
+
+
+def saturation(levels, tolerance=0.05):
+    """Primer nivel de concurrencia a partir del cual el throughput deja de crecer."""
+    for prev, cur in zip(levels, levels[1:]):
+        if cur["throughput_cps"] < prev["throughput_cps"] * (1 + tolerance):
+            return prev["sessions"]
+    return None
+
+
+# -------------------------------
+# CLI
+# -------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive the simulator with N concurrent headless sessions.")
+    parser.add_argument("--sessions", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--commands", type=int, default=50, help="Commands per session")
+    parser.add_argument("--think-ms", type=float, default=0.0)
+    parser.add_argument("--mode", choices=("threads", "apptest"), default="threads")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    levels = [run_level(int(n), args.commands, args.think_ms, args.mode, args.seed)
+              for n in args.sessions.split(",")]
+    report = {"mode": args.mode, "levels": levels, "saturates_at_sessions": saturation(levels)}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"{'sessions':>8} {'cmds':>7} {'cmd/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'MB/sess':>8}")
+    for lv in levels:
+        lat = lv["latency_ms"]
+        print(f"{lv['sessions']:>8} {lv['commands']:>7} {lv['throughput_cps']:>9} {lat['p50']:>9} "
+              f"{lat['p95']:>9} {lat['p99']:>9} {lv['mem_per_session_mb']:>8}")
+    if report["saturates_at_sessions"]:
+        print(f"Throughput stops scaling at ~{report['saturates_at_sessions']} concurrent sessions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
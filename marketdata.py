@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Seeded synthetic market-data simulator
+
+Cada instrumento tiene su propio generador sembrado con (tipo de serie,
+ticker), de modo que su trayectoria no depende del resto del universo ni
+del orden de la consulta. Los shocks se escriben en matrices
+preasignadas (instrumentos x pasos) y la dinámica se aplica vectorizada
+sobre todo el corte transversal.
+"""
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+TRADING_DAYS = 252
+
+
+# -------------------------------
+# SEMILLAS
+# -------------------------------
+def normalize_ticker(ticker):
+    return " ".join((ticker or "").upper().split())
+
+
+def ticker_seed(kind, ticker):
+    return zlib.crc32(f"{kind}|{normalize_ticker(ticker)}".encode("utf-8"))
+
+
+def _generators(kind, tickers):
+    return [np.random.default_rng(ticker_seed(kind, t)) for t in tickers]
+
+
+def _draw(rngs, n_params, n_steps, jumps=False):
+    """Parámetros uniformes (n, n_params) y shocks normales (n, n_steps), preasignados."""
+    n = len(rngs)
+    params = np.empty((n, n_params))
+    shocks = np.empty((n, n_steps))
+    jump_u = np.empty((n, n_steps)) if jumps else None
+    jump_z = np.empty((n, n_steps)) if jumps else None
+    for i, rng in enumerate(rngs):
+        rng.random(out=params[i])
+        rng.standard_normal(out=shocks[i])
+        if jumps:
+            rng.random(out=jump_u[i])
+            rng.standard_normal(out=jump_z[i])
+    return params, shocks, jump_u, jump_z
+
+
+def _scale(u, low, high):
+    return low + (high - low) * u
+
+
+# -------------------------------
+# PROCESOS
+# -------------------------------
+def gbm_paths(tickers, n_steps, dt=1 / TRADING_DAYS, jump_intensity=3.0):
+    """Precios de acciones: GBM con saltos de Merton (lognormales)."""
+    rngs = _generators("equity", tickers)
+    params, shocks, jump_u, jump_z = _draw(rngs, 3, n_steps, jumps=True)
+    s0 = _scale(params[:, 0], 20, 400)[:, None]
+    mu = _scale(params[:, 1], -0.05, 0.15)[:, None]
+    sigma = _scale(params[:, 2], 0.15, 0.55)[:, None]
+
+    jumps = (jump_u < jump_intensity * dt) * (-0.02 + 0.06 * jump_z)
+    log_ret = shocks
+    log_ret *= sigma * np.sqrt(dt)
+    log_ret += (mu - 0.5 * sigma ** 2) * dt + jumps
+
+    out = np.empty((len(tickers), n_steps + 1))
+    out[:, 0] = 0.0
+    np.cumsum(log_ret, axis=1, out=out[:, 1:])
+    np.exp(out, out=out)
+    out *= s0
+    return out
+
+
+def ou_paths(kind, tickers, n_steps, x0_range, theta_range, sigma_range, kappa_range=(0.5, 3.0),
+             dt=1 / TRADING_DAYS):
+    """Ornstein-Uhlenbeck con discretización exacta, vectorizado sobre instrumentos."""
+    rngs = _generators(kind, tickers)
+    params, shocks, _, _ = _draw(rngs, 4, n_steps)
+    x0 = _scale(params[:, 0], *x0_range)
+    theta = _scale(params[:, 1], *theta_range)
+    sigma = _scale(params[:, 2], *sigma_range)
+    kappa = _scale(params[:, 3], *kappa_range)
+
+    decay = np.exp(-kappa * dt)
+    noise = sigma * np.sqrt((1 - decay ** 2) / (2 * kappa))
+    shocks *= noise[:, None]
+
+    out = np.empty((len(tickers), n_steps + 1))
+    out[:, 0] = x0
+    for t in range(n_steps):
+        out[:, t + 1] = theta + (out[:, t] - theta) * decay + shocks[:, t]
+    return out
+
+
+def yield_paths(tickers, n_steps):
+    """Yields en %."""
+    return ou_paths("yield", tickers, n_steps, x0_range=(2.0, 7.0), theta_range=(2.5, 6.5), sigma_range=(0.4, 1.2))
+
+
+def spread_paths(tickers, n_steps):
+    """Spreads en bps: OU sobre log-spread para mantenerlos positivos."""
+    log_s = ou_paths("spread", tickers, n_steps, x0_range=(np.log(60), np.log(450)),
+                     theta_range=(np.log(80), np.log(350)), sigma_range=(0.3, 0.8))
+    return np.exp(log_s, out=log_s)
+
+
+def bond_price_paths(tickers, n_steps, duration=5.0):
+    """Precio limpio aproximado por duración modificada a partir de la trayectoria de yields."""
+    y = yield_paths(tickers, n_steps)
+    y -= y[:, :1]
+    y *= -duration / 100
+    np.exp(y, out=y)
+    y *= 100
+    return y
+
+
+def ohlcv_paths(tickers, n_steps):
+    """Barras diarias (instrumentos x [close, high, low, volume] x pasos) sobre la trayectoria GBM."""
+    close = gbm_paths(tickers, n_steps)
+    rngs = _generators("ohlcv", tickers)
+    params, shocks, jump_u, _ = _draw(rngs, 1, n_steps + 1, jumps=True)
+    # Rango intradía proporcional a |shock| y volumen lognormal alrededor de un nivel por ticker
+    span = 0.004 + 0.01 * np.abs(shocks)
+    out = np.empty((len(tickers), 4, n_steps + 1))
+    out[:, 0] = close
+    out[:, 1] = close * (1 + span * jump_u)
+    out[:, 2] = close * (1 - span * (1 - jump_u))
+    out[:, 3] = np.exp(_scale(params[:, :1], 12, 17) + 0.4 * shocks)
+    return out
+
+
+GENERATORS = {
+    "equity": gbm_paths,
+    "ohlcv": ohlcv_paths,
+    "yield": yield_paths,
+    "spread": spread_paths,
+    "bond_price": bond_price_paths,
+}
+
+
+# -------------------------------
+# BONOS POR EMISOR (CORTE TRANSVERSAL)
+# -------------------------------
+BOND_CURVE_SHAPES = {
+    # nivel, pendiente (largo - corto), curvatura, ruido. En spread la pendiente es una fracción
+    # del nivel: el tramo corto queda por encima de la mitad del nivel y nunca es negativo
+    "spread": ((60, 450), (0.1, 0.5), (-60, 60), 6.0),
+    "yield": ((2.5, 6.0), (-1.5, 2.0), (-1.0, 1.0), 0.04),
+}
+
+
+def _ns_curve_params(kind, issuers, n_bonds):
+    """Parámetros NS por emisor y uniformes/normales para sus bonos (mismo generador)."""
+    level, slope, curvature, _ = BOND_CURVE_SHAPES[kind]
+    rngs = _generators(f"bonds:{kind}", issuers)
+    params = np.empty((len(issuers), 4))
+    u = np.empty((len(issuers), 3, n_bonds))
+    for i, rng in enumerate(rngs):
+        rng.random(out=params[i])
+        rng.random(out=u[i, :2])
+        rng.standard_normal(out=u[i, 2])
+    b0 = _scale(params[:, 0], *level)
+    b1 = -_scale(params[:, 1], *slope)
+    if kind == "spread":
+        b1 *= b0
+    betas = np.stack([b0, b1, _scale(params[:, 2], *curvature)], axis=1)
+    return betas, params[:, 3], u
+
+
+def _ns_values(betas, maturities, tau=2.0):
+    x = np.asarray(maturities, dtype=float) / tau
+    loading = (1 - np.exp(-x)) / x
+    return betas[:, :1] + betas[:, 1:2] * loading + betas[:, 2:3] * (loading - np.exp(-x))
+
+
+def issuer_bonds(kind, issuers, n_bonds=8, green_share=0.3, greenium=(-8.0, -1.0)):
+    """Bonos sintéticos por emisor sobre una curva Nelson-Siegel propia.
+
+    Devuelve vectores planos (emisor, vencimiento, valor, es_verde); los bonos
+    verdes cotizan con un descuento (greenium) sobre la curva convencional.
+    """
+    noise = BOND_CURVE_SHAPES[kind][3]
+    betas, greenium_u, u = _ns_curve_params(kind, issuers, n_bonds)
+    maturities = np.round(0.5 + 29.5 * u[:, 0] ** 1.5, 2)
+    values = _ns_values(betas, maturities) + noise * u[:, 2]
+
+    green = u[:, 1] < green_share
+    if kind == "spread":
+        values += green * _scale(greenium_u, *greenium)[:, None]
+
+    keys = np.repeat(np.asarray(issuers, dtype=object), n_bonds)
+    return keys, maturities.ravel(), values.ravel(), green.ravel()
+
+
+def term_structure(kind, issuers, horizons):
+    """Curva sin ruido de cada emisor (la misma que genera sus bonos) sobre `horizons`."""
+    betas, _, _ = _ns_curve_params(kind, issuers, 0)
+    return _ns_values(betas, np.broadcast_to(horizons, (len(issuers), len(horizons))))
+
+
+# -------------------------------
+# CACHE COMPARTIDA
+# -------------------------------
+class SeriesCache:
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key, factory):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+        value = factory()
+        value.setflags(write=False)
+        with self._lock:
+            self._data[key] = value
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+SERIES_CACHE = SeriesCache()
+
+
+def universe(kind, tickers, n_steps=TRADING_DAYS):
+    """Matriz (instrumentos x n_steps+1) de solo lectura para todo el universo en una llamada."""
+    tickers = tuple(normalize_ticker(t) for t in tickers)
+    return SERIES_CACHE.get_or_create(
+        (kind, tickers, n_steps),
+        lambda: GENERATORS[kind](tickers, n_steps),
+    )
+
+
+def series(kind, ticker, n_steps=TRADING_DAYS):
+    return universe(kind, [ticker], n_steps)[0]
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Pre-rendered HTML panels for the terminal output
+
+Todo el texto se escapa con html.escape: el contexto y la consulta los
+escribe el usuario y nunca deben llegar como HTML crudo. El bloque de cada
+función se renderiza una sola vez por versión de la KB.
+"""
+import os
+import threading
+from html import escape
+
+import kb
+
+_BREAKDOWN_CACHE = {}
+_LOCK = threading.Lock()
+
+
+# -------------------------------
+# FRAGMENTOS
+# -------------------------------
+def _span(css, text):
+    return f"<span class='{css}'>{escape(str(text))}</span>"
+
+
+def _render_breakdown(entry):
+    parts = [
+        "<h4>🟨 Function Logic Breakdown</h4>",
+        "<p>",
+        _span("command", "¿Para qué sirve?"), "<br>",
+        _span("reference", entry["purpose"]), "<br><br>",
+        _span("command", "¿Para qué instrumento / emisor / mercado está diseñada?"), "<br>",
+        _span("reference", entry["universe"]), "<br><br>",
+        _span("command", "¿Qué output entrega y cómo interpretarlo?"), "<br>",
+        _span("reference", entry["output"]), "<br><br>",
+        _span("command", "¿Qué supuestos asume?"), "<br>",
+        _span("negative", entry["assumptions"]),
+        "</p>",
+        "<h4>🚨 When NOT to use this function</h4>",
+    ]
+    parts += [f"<div>{_span('negative', '⚠ ' + item)}</div>" for item in entry["not_applicable"]]
+    return "".join(parts)
+
+
+def breakdown_html(mnemonic):
+    """Fragmento de la KB, cacheado por (versión de la KB, mnemónico)."""
+    key = (kb.KB_VERSION, mnemonic)
+    html = _BREAKDOWN_CACHE.get(key)
+    if html is None:
+        html = _render_breakdown(kb.FUNCTION_KB[mnemonic])
+        with _LOCK:
+            _BREAKDOWN_CACHE[key] = html
+    return html
+
+
+def prerender_all():
+    for mnemonic in kb.FUNCTION_KB:
+        breakdown_html(mnemonic)
+
+
+# -------------------------------
+# PANEL COMPLETO
+# -------------------------------
+def _field(label, css, value):
+    return f"<div><b>{label}:</b> {_span(css, value)}</div>"
+
+
+def _suggestions_html(suggestions):
+    if not suggestions:
+        return ""
+    return "<div>Did you mean: " + ", ".join(_span("command", s) for s in suggestions) + "?</div>"
+
+
+def output_html(result):
+    """Todo el texto de un resultado del engine en un único fragmento (un solo st.markdown)."""
+    if result.status == "empty":
+        body = _span("inactive", "Empty command.")
+
+    elif result.status == "search":
+        body = _field("Search", "reference", result.query)
+        if not result.matches:
+            body += f"<div>{_span('inactive', 'No matching functions.')}</div>"
+        for mnemonic, _ in result.matches:
+            purpose = kb.FUNCTION_KB[mnemonic]["purpose"]
+            body += f"<div>{_span('command', mnemonic)} — {_span('reference', purpose)}</div>"
+
+    elif result.status == "screen":
+        body = _field("Screen", "reference", result.query)
+        if result.error:
+            body += f"<div>{_span('negative', result.error)}</div>"
+        else:
+            body += screen_html(result.screen)
+
+    elif result.status == "pipeline":
+        body = _field("Pipeline", "command", " | ".join(stage.function for stage in result.stages) or result.command)
+        if result.error:
+            body += f"<div>{_span('negative', result.error)}</div>"
+
+    elif result.status == "export":
+        body = _field("Export", "reference", result.query)
+        if result.error:
+            body += f"<div>{_span('negative', result.error)}</div>"
+
+    elif result.context is None:
+        body = _field("Function Executed", "command", result.function) + "<div><b>Context:</b> GLOBAL</div>"
+        body += _suggestions_html(result.suggestions)
+
+    else:
+        body = _field("Context", "reference", result.context) + _field("Function", "command", result.function)
+        if result.status == "documented":
+            body += breakdown_html(result.function)
+        else:
+            body += f"<div>{_span('inactive', 'Function recognized but not documented.')}</div>"
+            body += _suggestions_html(result.suggestions)
+
+    return f'<div class="panel">{body}</div>'
+
+
+# -------------------------------
+# PANEL DE COTIZACIÓN EN VIVO
+# -------------------------------
+def quote_html(ticker, snap):
+    if not snap["seq"]:
+        return f'<div class="panel">{_span("inactive", f"Waiting for quotes on {ticker}...")}</div>'
+    bid, ask = snap["bid"][-1], snap["ask"][-1]
+    mid = (bid + ask) / 2
+    first = (snap["bid"][0] + snap["ask"][0]) / 2
+    change = mid - first
+    css = "positive" if change >= 0 else "negative"
+    info = f"{snap['coalesced']} ticks since last refresh · seq {snap['seq']}"
+    rows = [
+        f"<div><b>LIVE</b> {_span('reference', ticker)}</div>",
+        f"<div>{_span('command', 'BID')} {bid:.3f} &nbsp; {_span('command', 'ASK')} {ask:.3f}"
+        f" &nbsp; {_span('command', 'MID')} {mid:.3f} &nbsp; {_span(css, f'{change:+.3f}')}</div>",
+        f"<div>{_span('inactive', info)}</div>",
+    ]
+    return f'<div class="panel">{"".join(rows)}</div>'
+
+
+# -------------------------------
+# PANEL DE PERFORMANCE (PERF <GO>)
+# -------------------------------
+_SPARK = "▁▂▃▄▅▆▇█"
+
+
+def _sparkline(counts):
+    top = max(counts) or 1
+    return "".join(" " if n == 0 else _SPARK[min(len(_SPARK) - 1, n * len(_SPARK) // (top + 1))] for n in counts)
+
+
+def perf_html(snapshot, profile_armed=False):
+    from perf import BUCKETS, STAGES
+
+    series, commands, profiles = snapshot
+    head = "".join(f"<th>{h}</th>" for h in ("Function", "Stage", "n", "p50 ms", "p95 ms", "p99 ms", "Histogram"))
+    rows = []
+    for function in sorted({f for _, f in series}):
+        for stage in STAGES:
+            s = series.get((stage, function))
+            if s is None:
+                continue
+            p = s["percentiles"]
+            rows.append(
+                "<tr>"
+                f"<td>{_span('command', function) if stage == 'total' else ''}</td>"
+                f"<td>{_span('reference', stage)}</td><td>{s['count']}</td>"
+                f"<td>{p['p50'] * 1000:.2f}</td><td>{p['p95'] * 1000:.2f}</td><td>{p['p99'] * 1000:.2f}</td>"
+                f"<td><code>{_sparkline(s['histogram'])}</code></td>"
+                "</tr>"
+            )
+    if not rows:
+        rows.append(f"<tr><td colspan='7'>{_span('inactive', 'No commands recorded yet.')}</td></tr>")
+
+    legend = " · ".join(f"≤{b * 1000:g}" for b in BUCKETS) + " · >2500 ms"
+    body = [
+        "<h4>⏱ Performance (this process, rolling window)</h4>",
+        f"<table><tr>{head}</tr>{''.join(rows)}</table>",
+        f"<div>{_span('inactive', 'Histogram buckets: ' + legend)}</div>",
+        f"<div>{_span('inactive', f'{sum(commands.values())} commands recorded')}</div>",
+    ]
+    if profile_armed:
+        body.append(f"<div>{_span('positive', 'cProfile armed for your next command.')}</div>")
+    for profile in reversed(profiles):
+        body.append(f"<h4>cProfile — {escape(profile['command'])}</h4><pre>{escape(profile['stats'])}</pre>")
+    return f'<div class="panel">{"".join(body)}</div>'
+
+
+# -------------------------------
+# HISTORIAL (HIST <GO>)
+# -------------------------------
+def history_html(rows, filters, replayed=None):
+    import time
+
+    scope = "all sessions" if filters.get("session") is None else "this session"
+    if filters.get("function"):
+        scope += f" · {filters['function']}"
+    head = "".join(f"<th>{h}</th>" for h in ("Time", "Command", "Status", "ms"))
+    lines = []
+    for row in rows:
+        ms = "" if row["latency_ms"] is None else f"{row['latency_ms']:.1f}"
+        lines.append(
+            f"<tr><td>{time.strftime('%H:%M:%S', time.localtime(row['ts']))}</td>"
+            f"<td>{_span('command', row['command'])}</td><td>{_span('reference', row['status'])}</td>"
+            f"<td>{ms}</td></tr>"
+        )
+    if not lines:
+        lines.append(f"<tr><td colspan='4'>{_span('inactive', 'No commands recorded yet.')}</td></tr>")
+    body = [f"<h4>🕘 Command History ({escape(scope)})</h4>", f"<table><tr>{head}</tr>{''.join(lines)}</table>"]
+
+    if replayed is not None:
+        diffs = [(row, result) for row, result in replayed if row["status"] != result.status]
+        css = "negative" if diffs else "positive"
+        body.append(f"<div>{_span(css, f'Replayed {len(replayed)} commands, {len(diffs)} status changes.')}</div>")
+        for row, result in diffs:
+            body.append(f"<div>{_span('command', row['command'])}: "
+                        f"{_span('inactive', row['status'])} → {_span('negative', result.status)}</div>")
+    return f'<div class="panel">{"".join(body)}</div>'
+
+
+# -------------------------------
+# SCREENER (EQS <filtro> <GO>)
+# -------------------------------
+def screen_html(screen):
+    from screener import COUNTRIES, SECTORS
+
+    rows = screen["rows"]
+    head = "".join(f"<th>{h}</th>" for h in ("Ticker", "Sector", "Country", "Mkt cap", "Price", "P/E",
+                                             "P/B", "Div %", "ROE %", "Beta"))
+    lines = []
+    for i in range(len(screen["index"])):
+        pe = rows["PE"][i]
+        lines.append(
+            f"<tr><td>{_span('command', rows['TICKER'][i])}</td><td>{SECTORS[rows['SECTOR'][i]]}</td>"
+            f"<td>{COUNTRIES[rows['COUNTRY'][i]]}</td><td>{rows['MKTCAP'][i] / 1e9:,.2f}B</td>"
+            f"<td>{rows['PRICE'][i]:.2f}</td><td>{'n/a' if pe != pe else f'{pe:.1f}'}</td>"
+            f"<td>{rows['PB'][i]:.2f}</td><td>{rows['DIVYLD'][i]:.2f}</td><td>{rows['ROE'][i]:.1f}</td>"
+            f"<td>{rows['BETA'][i]:.2f}</td></tr>"
+        )
+    summary = f"{screen['count']:,} of {screen['universe']:,} equities match {screen['query']}"
+    body = [f"<div>{_span('positive', summary)}</div>"]
+    if lines:
+        body.append(f"<div>{_span('inactive', f'Top {len(lines)} by market cap')}</div>")
+        body.append(f"<table><tr>{head}</tr>{''.join(lines)}</table>")
+    return "".join(body)
+
+
+# -------------------------------
+# EXPORTACIÓN (XLTP <función> <GO>)
+# -------------------------------
+def export_html(job, link=True):
+    import time
+
+    target = f"{job.function} {job.context or ''}".strip()
+    elapsed = (job.finished or time.time()) - job.started
+    rows = [f"<div><b>XLTP</b> {_span('command', target)} → {_span('reference', job.fmt.upper())}</div>"]
+    if job.status == "running":
+        rows.append(f"<div>{_span('inactive', f'Exporting... {job.rows:,} rows written ({elapsed:.1f} s)')}</div>")
+    elif job.status == "failed":
+        rows.append(f"<div>{_span('negative', job.error)}</div>")
+    else:
+        size = os.path.getsize(job.path) / 1e6
+        rows.append(f"<div>{_span('positive', f'{job.rows:,} rows · {size:.1f} MB · {elapsed:.1f} s')}</div>")
+        if link:
+            rows.append(f'<div><a href="{escape(job.url)}" download="{escape(job.filename)}">'
+                        f"⬇ {escape(job.filename)}</a></div>")
+    return f'<div class="panel">{"".join(rows)}</div>'
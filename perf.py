@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Per-command latency instrumentation
+
+Cada <GO> abre un CommandTrace que cronometra sus etapas (parse, kb_lookup,
+html, chart, quotes). Al cerrarse, las duraciones se vuelcan en el
+Recorder del proceso: ventanas móviles para percentiles, histogramas
+acumulados con buckets fijos para Prometheus y contadores por función y
+status. Opcionalmente un trace puede capturar un perfil cProfile.
+"""
+import bisect
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import resources
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+WINDOW = 1000
+STAGES = ("parse", "kb_lookup", "html", "chart", "quotes", "total")
+
+
+# -------------------------------
+# RECORDER (POR PROCESO)
+# -------------------------------
+class _Series:
+
+    def __init__(self):
+        self.window = deque(maxlen=WINDOW)
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, seconds):
+        self.window.append(seconds)
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def percentiles(self):
+        values = sorted(self.window)
+        if not values:
+            return {}
+        pick = lambda q: values[min(len(values) - 1, int(len(values) * q))]
+        return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+
+    def window_histogram(self):
+        counts = [0] * (len(BUCKETS) + 1)
+        for v in self.window:
+            counts[bisect.bisect_left(BUCKETS, v)] += 1
+        return counts
+
+
+# Lo tipeado que no es una función conocida va a una sola serie: cada error de tipeo no
+# agrega series (memoria sin límite en el proceso compartido) ni etiquetas a Prometheus
+UNKNOWN_FUNCTION = "UNKNOWN"
+
+
+def function_label(function, status):
+    if status == "undocumented":
+        return UNKNOWN_FUNCTION
+    if status == "global":
+        from kb import FUNCTION_KB
+        return function if function in FUNCTION_KB else UNKNOWN_FUNCTION
+    return function
+
+
+class Recorder:
+
+    def __init__(self):
+        self.series = defaultdict(_Series)
+        self.commands = defaultdict(int)
+        self.profiles = deque(maxlen=5)
+        self._lock = threading.Lock()
+
+    def record(self, function, status, stages):
+        function = function_label(function, status)
+        with self._lock:
+            self.commands[(function, status)] += 1
+            for stage, seconds in stages.items():
+                self.series[(stage, function)].add(seconds)
+
+    def add_profile(self, command, text):
+        with self._lock:
+            self.profiles.append({"command": command, "stats": text})
+
+    def snapshot(self):
+        """Copia consistente para renderizar sin sostener el lock."""
+        with self._lock:
+            return {
+                key: {"count": s.count, "sum": s.sum, "percentiles": s.percentiles(),
+                      "histogram": s.window_histogram(), "buckets": list(s.buckets)}
+                for key, s in self.series.items()
+            }, dict(self.commands), list(self.profiles)
+
+    def reset(self):
+        with self._lock:
+            self.series.clear()
+            self.commands.clear()
+            self.profiles.clear()
+
+
+def get_recorder():
+    return resources.shared("perf_recorder", Recorder)
+
+
+# -------------------------------
+# TRACE POR COMANDO
+# -------------------------------
+class CommandTrace:
+
+    def __init__(self, command, profile=False):
+        self.command = command
+        self.function = None
+        self.status = None
+        self.stages = {}
+        self._start = time.perf_counter()
+        self._profiler = cProfile.Profile() if profile else None
+        if self._profiler is not None:
+            self._profiler.enable()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def finish(self, recorder=None):
+        self.stages["total"] = time.perf_counter() - self._start
+        recorder = recorder or get_recorder()
+        if self._profiler is not None:
+            self._profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(25)
+            recorder.add_profile(self.command, out.getvalue())
+        recorder.record(self.function or "-", self.status or "-", self.stages)
+        return self.stages
+
+
+class _NullTrace:
+    """Trace vacío para llamadas sin instrumentar (batch, benchmarks)."""
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+
+NULL_TRACE = _NullTrace()
+
+
+# -------------------------------
+# EXPORTACIÓN
+# -------------------------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def prometheus_text(recorder=None):
+    series, commands, _ = (recorder or get_recorder()).snapshot()
+    lines = [
+        "# HELP bbg_stage_seconds Latency of each command stage.",
+        "# TYPE bbg_stage_seconds histogram",
+    ]
+    for (stage, function), s in sorted(series.items()):
+        cumulative = 0
+        for bound, n in zip(list(BUCKETS) + ["+Inf"], s["buckets"]):
+            cumulative += n
+            lines.append(f"bbg_stage_seconds_bucket{_labels(stage=stage, function=function, le=bound)} {cumulative}")
+        lines.append(f"bbg_stage_seconds_sum{_labels(stage=stage, function=function)} {s['sum']:.6f}")
+        lines.append(f"bbg_stage_seconds_count{_labels(stage=stage, function=function)} {s['count']}")
+    lines += ["# HELP bbg_commands_total Commands executed.", "# TYPE bbg_commands_total counter"]
+    for (function, status), n in sorted(commands.items()):
+        lines.append(f"bbg_commands_total{_labels(function=function, status=status)} {n}")
+    return "\n".join(lines) + "\n"
+
+
+def json_lines(recorder=None):
+    series, _, _ = (recorder or get_recorder()).snapshot()
+    ts = time.time()
+    out = []
+    for (stage, function), s in sorted(series.items()):
+        row = {"ts": ts, "stage": stage, "function": function, "count": s["count"], "sum_s": s["sum"]}
+        row.update({k: round(v * 1000, 3) for k, v in s["percentiles"].items()})
+        out.append(json.dumps(row))
+    return "\n".join(out) + ("\n" if out else "")
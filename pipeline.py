@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent rendering for multi-command pipelines (IBM US BVAL | BGN | MIPD <GO>)
+
+El engine resuelve las etapas en serie (parseo y KB son baratos). El plan
+agrupa los gráficos por su clave de cache: etapas con el mismo (gráfico,
+contexto, opciones) -- BVAL, BGN y BT sobre el mismo bono -- esperan un
+único render. Los renders distintos corren a la vez en un pool compartido
+y se entregan en orden de finalización, así que el pipeline tarda lo que
+la etapa más lenta y no la suma.
+
+Por defecto el pool es de hilos (comparte las caches del proceso; las
+figuras no usan pyplot). Con BBG_PIPELINE_PROCESSES=1 se usa un pool de
+procesos (spawn) y el PNG resultante se guarda en la cache del proceso
+principal.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import resources
+
+WORKERS = int(os.environ.get("BBG_PIPELINE_WORKERS", "4"))
+USE_PROCESSES = os.environ.get("BBG_PIPELINE_PROCESSES") == "1"
+
+
+def plan(stages, options_for):
+    """Renders únicos {clave: (gráfico, contexto, opciones)} y la clave que espera cada etapa."""
+    from charts import chart_key
+
+    jobs, stage_keys = {}, []
+    for stage in stages:
+        if stage.chart is None:
+            stage_keys.append(None)
+            continue
+        options = options_for(stage)
+        key = chart_key(stage.chart, stage.context, **options)
+        jobs.setdefault(key, (stage.chart, stage.context, options))
+        stage_keys.append(key)
+    return jobs, stage_keys
+
+
+def _render(chart, context, options):
+    from charts import render_chart
+    return render_chart(chart, context, **options)
+
+
+def get_pool():
+    def build():
+        if USE_PROCESSES:
+            return ProcessPoolExecutor(WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return ThreadPoolExecutor(WORKERS, thread_name_prefix="pipeline")
+    return resources.shared("pipeline_pool", build)
+
+
+def run(stages, options_for, pool=None):
+    """Produce (índices de etapa, png) a medida que termina cada render único."""
+    from charts import CHART_CACHE
+
+    jobs, stage_keys = plan(stages, options_for)
+    pool = pool or get_pool()
+    pending = {}
+    for key, (chart, context, options) in jobs.items():
+        waiting = [i for i, k in enumerate(stage_keys) if k == key]
+        png = CHART_CACHE.get(key)
+        if png is not None:
+            yield waiting, png
+        else:
+            pending[pool.submit(_render, chart, context, options)] = (key, waiting)
+    for future in as_completed(pending):
+        key, waiting = pending[future]
+        png = future.result()
+        CHART_CACHE.put(key, png)
+        yield waiting, png
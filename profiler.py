@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Cold-start and rerun latency profiler
+
+Usage:
+    python profiler.py [--cold-budget-ms N] [--rerun-budget-ms N] [--imports-budget-ms N] [--json]
+
+Cada medición corre en un proceso nuevo para que las cachés de import no
+contaminen el resultado. Si se supera algún presupuesto el proceso termina
+con código 1 (apto para CI).
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Módulos propios que importa app.py al arrancar la página (más resources.warm_up())
+STARTUP_MODULES = ["engine", "export", "journal", "kb", "panels", "perf", "resources", "suggest"]
+
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+# -------------------------------
+# IMPORT-TIME BREAKDOWN
+# -------------------------------
+def _importtime(code):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=HERE, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if m:
+            self_us, cumulative_us, indent, name = m.groups()
+            rows.append({"module": name, "self_ms": int(self_us) / 1000,
+                         "cumulative_ms": int(cumulative_us) / 1000, "depth": len(indent) // 2})
+    return rows
+
+
+def import_breakdown(modules=STARTUP_MODULES, top=15):
+    # Lo que importa el intérprete por sí solo (site, encodings...) no cuenta
+    baseline = {r["module"] for r in _importtime("pass")}
+    code = "; ".join(f"import {m}" for m in modules) + "; import resources; resources.warm_up()"
+    rows = [r for r in _importtime(code) if r["module"] not in baseline]
+    total = sum(r["cumulative_ms"] for r in rows if r["depth"] == 0)
+    loaded = {r["module"] for r in rows}
+    return {
+        "total_ms": round(total, 1),
+        "top": sorted(rows, key=lambda r: -r["cumulative_ms"])[:top],
+        "deferred": {m: m not in loaded for m in ("numpy", "matplotlib", "pandas")},
+    }
+
+
+# -------------------------------
+# PRIMER RENDER Y RERUN
+# -------------------------------
+_RENDER_SCRIPT = r"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+t0 = time.perf_counter()
+at = AppTest.from_file("app.py", default_timeout=120).run()
+first_render = time.perf_counter() - t0
+
+def rerun(command):
+    at.text_input[0].input(command)
+    at.button[0].click()
+    t = time.perf_counter()
+    at.run()
+    assert not at.exception, at.exception
+    return time.perf_counter() - t
+
+first_chart = rerun(sys.argv[1])
+reruns = sorted(rerun(sys.argv[1]) for _ in range(int(sys.argv[2])))
+print(json.dumps({
+    "first_render_ms": first_render * 1000,
+    "first_chart_ms": first_chart * 1000,
+    "rerun_median_ms": reruns[len(reruns) // 2] * 1000,
+    "rerun_max_ms": reruns[-1] * 1000,
+}))
+"""
+
+
+def render_timings(command="IBM US NIA <GO>", reruns=10):
+    proc = subprocess.run(
+        [sys.executable, "-c", _RENDER_SCRIPT, command, str(reruns)],
+        cwd=HERE, capture_output=True, text=True, check=True,
+    )
+    timings = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {k: round(v, 1) for k, v in timings.items()}
+
+
+def profile(command="IBM US NIA <GO>", reruns=10):
+    return {"imports": import_breakdown(), "render": render_timings(command, reruns)}
+
+
+# -------------------------------
+# CLI / PRESUPUESTO
+# -------------------------------
+def check_budget(report, cold_ms=None, rerun_ms=None, imports_ms=None):
+    failures = []
+    if imports_ms is not None and report["imports"]["total_ms"] > imports_ms:
+        failures.append(f"startup imports {report['imports']['total_ms']} ms > {imports_ms} ms")
+    if cold_ms is not None and report["render"]["first_render_ms"] > cold_ms:
+        failures.append(f"first render {report['render']['first_render_ms']} ms > {cold_ms} ms")
+    if rerun_ms is not None and report["render"]["rerun_median_ms"] > rerun_ms:
+        failures.append(f"rerun median {report['render']['rerun_median_ms']} ms > {rerun_ms} ms")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile cold start and rerun latency of the simulator.")
+    parser.add_argument("--command", default="IBM US NIA <GO>")
+    parser.add_argument("--reruns", type=int, default=10)
+    parser.add_argument("--imports-budget-ms", type=float)
+    parser.add_argument("--cold-budget-ms", type=float)
+    parser.add_argument("--rerun-budget-ms", type=float)
+    parser.add_argument("--json", action="store_true", help="Print the raw report as JSON")
+    args = parser.parse_args(argv)
+
+    report = profile(args.command, args.reruns)
+    failures = check_budget(report, args.cold_budget_ms, args.rerun_budget_ms, args.imports_budget_ms)
+    report["budget_failures"] = failures
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        imports = report["imports"]
+        print(f"Startup imports: {imports['total_ms']} ms")
+        for row in imports["top"]:
+            print(f"  {row['cumulative_ms']:>9.1f} ms  {row['module']}")
+        for name, deferred in imports["deferred"].items():
+            print(f"  {name}: {'deferred' if deferred else 'loaded at startup'}")
+        for name, value in report["render"].items():
+            print(f"{name}: {value} ms")
+        for failure in failures:
+            print(f"BUDGET EXCEEDED: {failure}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Simulated live quote feed for BGN / BT
+
+Un único event loop asyncio por proceso (en un hilo de fondo) produce ticks
+por ticker. Los productores publican en una cola acotada; si el consumidor
+se atrasa, la cola descarta el tick más viejo (backpressure por
+coalescencia) en lugar de bloquear al productor. El consumidor vuelca los
+ticks en ring buffers preasignados, y cada panel de la UI lee un snapshot
+al ritmo que quiera: los ticks intermedios se coalescen en esa lectura.
+"""
+import asyncio
+import threading
+import time
+import zlib
+
+import numpy as np
+
+import resources
+
+RING_SIZE = 512
+QUEUE_SIZE = 1024
+TICK_INTERVAL = 0.05
+IDLE_TIMEOUT = 30.0
+
+
+# -------------------------------
+# RING BUFFER
+# -------------------------------
+class TickRing:
+    """Columnas (ts, bid, ask) en arrays fijos; `seq` cuenta ticks totales escritos."""
+
+    def __init__(self, size=RING_SIZE):
+        self.size = size
+        self.ts = np.zeros(size)
+        self.bid = np.zeros(size)
+        self.ask = np.zeros(size)
+        self.seq = 0
+        self._lock = threading.Lock()
+
+    def extend(self, ticks):
+        with self._lock:
+            for ts, bid, ask in ticks:
+                i = self.seq % self.size
+                self.ts[i], self.bid[i], self.ask[i] = ts, bid, ask
+                self.seq += 1
+
+    def snapshot(self, last=60):
+        with self._lock:
+            n = min(self.seq, self.size, last)
+            idx = (self.seq - n + np.arange(n)) % self.size
+            return {
+                "seq": self.seq,
+                "ts": self.ts[idx].copy(),
+                "bid": self.bid[idx].copy(),
+                "ask": self.ask[idx].copy(),
+            }
+
+
+# -------------------------------
+# FEED
+# -------------------------------
+class QuoteFeed:
+
+    def __init__(self, tick_interval=TICK_INTERVAL, queue_size=QUEUE_SIZE):
+        self.tick_interval = tick_interval
+        self.queue_size = queue_size
+        self.rings = {}
+        self.dropped = 0
+        self._producers = {}
+        self._last_seen = {}
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._queue = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="quote-feed", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._loop.create_task(self._consume())
+        self._loop.create_task(self._reap())
+        self._ready.set()
+        self._loop.run_forever()
+
+    # Productor por ticker: paseo aleatorio alrededor del último precio simulado
+    async def _produce(self, ticker):
+        import marketdata
+
+        rng = np.random.default_rng(zlib.crc32(f"quotes|{ticker}".encode("utf-8")))
+        mid = float(marketdata.series("bond_price", ticker, 9)[-1])
+        while True:
+            mid += rng.normal(0, 0.01)
+            half = 0.02 + abs(rng.normal(0, 0.01))
+            self._publish((ticker, time.time(), mid - half, mid + half))
+            await asyncio.sleep(self.tick_interval * rng.uniform(0.5, 1.5))
+
+    def _publish(self, tick):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(tick)
+
+    async def _consume(self):
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty() and len(batch) < 256:
+                batch.append(self._queue.get_nowait())
+            by_ticker = {}
+            for ticker, ts, bid, ask in batch:
+                by_ticker.setdefault(ticker, []).append((ts, bid, ask))
+            for ticker, ticks in by_ticker.items():
+                ring = self.rings.get(ticker)
+                if ring is not None:
+                    ring.extend(ticks)
+
+    async def _reap(self):
+        while True:
+            await asyncio.sleep(IDLE_TIMEOUT / 3)
+            now = time.monotonic()
+            with self._lock:
+                idle = [t for t, seen in self._last_seen.items() if now - seen > IDLE_TIMEOUT]
+                for ticker in idle:
+                    self._producers.pop(ticker).cancel()
+                    del self._last_seen[ticker]
+                    del self.rings[ticker]
+
+    def _start(self, ticker):
+        self._producers[ticker] = asyncio.ensure_future(self._produce(ticker), loop=self._loop)
+
+    def subscribe(self, ticker):
+        """Arranca el productor si hace falta; cada lectura renueva la suscripción."""
+        with self._lock:
+            self._last_seen[ticker] = time.monotonic()
+            if ticker not in self.rings:
+                self.rings[ticker] = TickRing()
+                self._loop.call_soon_threadsafe(self._start, ticker)
+            return self.rings[ticker]
+
+    def read(self, ticker, since_seq=0, last=60):
+        snap = self.subscribe(ticker).snapshot(last)
+        snap["coalesced"] = max(0, snap["seq"] - since_seq)
+        return snap
+
+
+def get_feed():
+    return resources.shared("quote_feed", QuoteFeed)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Process-wide shared resources
+
+Streamlit ejecuta el script una vez por sesión y por interacción, pero los
+módulos importados viven una sola vez por proceso. Todo el estado inmutable
+(KB, índices, datasets simulados) se construye aquí una única vez, con un
+lock por recurso, y todas las sesiones leen la misma instancia.
+"""
+import threading
+import time
+
+_RESOURCES = {}
+_BUILD_MS = {}
+_LOCKS = {}
+_REGISTRY_LOCK = threading.Lock()
+_WARM = False
+
+
+def _lock_for(name):
+    with _REGISTRY_LOCK:
+        return _LOCKS.setdefault(name, threading.Lock())
+
+
+def shared(name, factory):
+    """Devuelve el recurso `name`, construyéndolo con `factory()` la primera vez."""
+    try:
+        return _RESOURCES[name]
+    except KeyError:
+        pass
+    with _lock_for(name):
+        if name not in _RESOURCES:
+            start = time.perf_counter()
+            _RESOURCES[name] = factory()
+            _BUILD_MS[name] = (time.perf_counter() - start) * 1000
+    return _RESOURCES[name]
+
+
+def reset(name=None):
+    """Descarta un recurso (o todos) para forzar su reconstrucción; útil en benchmarks."""
+    global _WARM
+    with _REGISTRY_LOCK:
+        names = list(_RESOURCES) if name is None else [name]
+        for n in names:
+            _RESOURCES.pop(n, None)
+            _BUILD_MS.pop(n, None)
+        _WARM = False
+
+
+def warm_up():
+    """Precarga lo que necesita cualquier sesión; las llamadas siguientes no hacen nada."""
+    global _WARM
+    if _WARM:
+        return
+    import panels
+    import search
+    import suggest
+
+    suggest.get_index()
+    search.get_index()
+    panels.prerender_all()
+    _WARM = True
+
+
+def stats():
+    with _REGISTRY_LOCK:
+        return {name: {"build_ms": round(_BUILD_MS.get(name, 0.0), 2), "type": type(value).__name__}
+                for name, value in _RESOURCES.items()}
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Relative Rotation Graph engine (JdK RS-Ratio / RS-Momentum)
+
+La metodología JdK no es pública; se usa la aproximación habitual:
+    RS          = 100 * precio / benchmark, suavizado con EMA
+    RS-Ratio    = 100 + z-score móvil de RS
+    RS-Momentum = 100 + z-score móvil de la variación % de RS-Ratio
+Todo se calcula sobre la matriz (valores x barras) a la vez y el estado de
+cada paso permite incorporar observaciones nuevas sin recalcular la historia.
+"""
+import numpy as np
+
+import indicators as ind
+
+QUADRANTS = ("Leading", "Weakening", "Lagging", "Improving")
+
+
+def _zscore(x, window, state):
+    bands, state = ind.bollinger(x, window=window, k=1.0, state=state)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (x - bands["bb_mid"]) / (bands["bb_upper"] - bands["bb_mid"])
+    return z, state
+
+
+def quadrant(ratio, momentum):
+    """0=Leading, 1=Weakening, 2=Lagging, 3=Improving (índices sobre QUADRANTS)."""
+    q = np.where(ratio >= 100, np.where(momentum >= 100, 0, 1), np.where(momentum >= 100, 3, 2))
+    return np.where(np.isnan(ratio) | np.isnan(momentum), -1, q)
+
+
+class RRGEngine:
+
+    def __init__(self, names, window=14, smooth=5, tail=10):
+        self.names = list(names)
+        self.window = window
+        self.smooth = smooth
+        self.tail = tail
+        self._ema_state = None
+        self._ratio_state = None
+        self._mom_state = None
+        self._last_ratio = None
+        self._ratio_tail = np.full((len(self.names), 0), np.nan)
+        self._mom_tail = np.full((len(self.names), 0), np.nan)
+
+    def update(self, prices, benchmark):
+        """prices: (valores x barras nuevas); benchmark: (barras nuevas,)."""
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+        benchmark = np.asarray(benchmark, dtype=float).reshape(1, -1)
+
+        rs = 100.0 * prices / benchmark
+        rs, self._ema_state = ind.ema(rs, self.smooth, self._ema_state)
+
+        z, self._ratio_state = _zscore(rs, self.window, self._ratio_state)
+        ratio = 100.0 + z
+
+        prev = ratio[:, :1] * np.nan if self._last_ratio is None else self._last_ratio[:, None]
+        roc = 100.0 * (ratio / np.concatenate([prev, ratio[:, :-1]], axis=1) - 1.0)
+        self._last_ratio = ratio[:, -1].copy()
+        # El primer ROC no existe: se rellena con cero para no propagar NaN en las sumas móviles
+        roc = np.nan_to_num(roc, nan=0.0)
+        mz, self._mom_state = _zscore(roc, self.window, self._mom_state)
+        momentum = 100.0 + mz
+
+        self._ratio_tail = np.concatenate([self._ratio_tail, ratio], axis=1)[:, -self.tail:]
+        self._mom_tail = np.concatenate([self._mom_tail, momentum], axis=1)[:, -self.tail:]
+        return self.snapshot()
+
+    def snapshot(self):
+        ratio, momentum = self._ratio_tail[:, -1], self._mom_tail[:, -1]
+        return {
+            "names": self.names,
+            "rs_ratio": ratio,
+            "rs_momentum": momentum,
+            "quadrant": quadrant(ratio, momentum),
+            "tail_ratio": self._ratio_tail,
+            "tail_momentum": self._mom_tail,
+        }
+
+
+def compute(names, prices, benchmark, window=14, smooth=5, tail=10):
+    """Cálculo en una pasada sobre la historia completa."""
+    return RRGEngine(names, window, smooth, tail).update(prices, benchmark)
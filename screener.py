@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar equity screener (EQS)
+
+Usage:
+    python screener.py "PE<15 AND MKTCAP>1e9" [--limit 25]
+
+Universo sintético de ~50k acciones guardado por columnas (un array NumPy
+por campo). Cada campo numérico tiene un índice ordenado (argsort +
+valores ordenados): un predicado de rango se resuelve con searchsorted y
+marca solo las filas del tramo. Los campos categóricos tienen una máscara
+precalculada por valor. La consulta se compila a una combinación de
+máscaras booleanas; las máscaras por predicado y los resultados completos
+se cachean con el árbol de la consulta (valores exactos) como clave.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import resources
+
+UNIVERSE_SIZE = 50_000
+UNIVERSE_SEED = 20240101
+DEFAULT_LIMIT = 25
+
+SECTORS = ("TECH", "FINANCIALS", "ENERGY", "HEALTH", "INDUSTRIALS", "UTILITIES", "MATERIALS", "STAPLES",
+           "DISCRETIONARY", "COMMUNICATION", "REAL_ESTATE")
+COUNTRIES = ("US", "MX", "BR", "AR", "CL", "CO", "PE", "ES", "GB", "DE", "JP", "CN")
+
+# Campo -> descripción (los numéricos tienen índice ordenado)
+NUMERIC_FIELDS = {
+    "MKTCAP": "Market cap (USD)",
+    "PRICE": "Last price",
+    "PE": "Price / earnings (NaN if earnings <= 0)",
+    "PB": "Price / book",
+    "DIVYLD": "Dividend yield (%)",
+    "ROE": "Return on equity (%)",
+    "EPSGR": "EPS growth (%)",
+    "DEBTEQ": "Debt / equity",
+    "BETA": "Beta vs local index",
+    "VOL": "Annualized volatility (%)",
+    "ADV": "Average daily traded value (USD)",
+}
+CATEGORICAL_FIELDS = {"SECTOR": SECTORS, "COUNTRY": COUNTRIES}
+DISPLAY = ("TICKER", "SECTOR", "COUNTRY", "MKTCAP", "PRICE", "PE", "PB", "DIVYLD", "ROE", "BETA")
+
+
+class ScreenError(ValueError):
+    pass
+
+
+# -------------------------------
+# UNIVERSO COLUMNAR
+# -------------------------------
+def build_universe(n=UNIVERSE_SIZE, seed=UNIVERSE_SEED):
+    rng = np.random.default_rng(seed)
+    sector = rng.integers(0, len(SECTORS), n).astype(np.int8)
+    country = rng.choice(len(COUNTRIES), n, p=np.r_[0.35, np.full(len(COUNTRIES) - 1, 0.65 / (len(COUNTRIES) - 1))])
+    mktcap = np.exp(rng.normal(np.log(8e8), 1.8, n))
+    price = np.exp(rng.normal(np.log(40), 1.0, n))
+    earnings_yield = rng.normal(0.06, 0.05, n)
+    pe = np.where(earnings_yield > 0.005, 1 / np.maximum(earnings_yield, 0.005), np.nan)
+    roe = rng.normal(12, 10, n)
+    columns = {
+        "TICKER": np.array([f"EQ{i:05d} {COUNTRIES[c]}" for i, c in enumerate(country)], dtype=object),
+        "SECTOR": sector,
+        "COUNTRY": country.astype(np.int8),
+        "MKTCAP": mktcap,
+        "PRICE": price,
+        "PE": pe,
+        "PB": np.exp(rng.normal(0.6, 0.6, n)),
+        "DIVYLD": np.where(rng.random(n) < 0.35, 0.0, rng.gamma(2.0, 1.2, n)),
+        "ROE": roe,
+        "EPSGR": rng.normal(8, 20, n),
+        "DEBTEQ": rng.gamma(1.5, 0.5, n),
+        "BETA": rng.normal(1.0, 0.35, n),
+        "VOL": rng.gamma(6.0, 5.0, n),
+        "ADV": mktcap * np.exp(rng.normal(np.log(0.003), 0.7, n)),
+    }
+    for values in columns.values():
+        values.setflags(write=False)
+    return columns
+
+
+class Screener:
+
+    def __init__(self, columns, cache_size=256):
+        self.columns = columns
+        self.size = len(columns["TICKER"])
+        # Índice ordenado por campo numérico; argsort deja los NaN al final
+        self._order = {}
+        self._sorted = {}
+        self._valid = {}
+        for name in NUMERIC_FIELDS:
+            order = np.argsort(columns[name], kind="stable")
+            self._order[name] = order
+            self._sorted[name] = columns[name][order]
+            self._valid[name] = int(np.count_nonzero(~np.isnan(columns[name])))
+        self._categories = {
+            name: [columns[name] == i for i in range(len(values))] for name, values in CATEGORICAL_FIELDS.items()
+        }
+        self.cache_size = cache_size
+        self._masks = OrderedDict()
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Predicado -> máscara booleana
+    def _range_mask(self, field, op, value):
+        vals, order, valid = self._sorted[field], self._order[field], self._valid[field]
+        if op == "<":
+            lo, hi = 0, np.searchsorted(vals[:valid], value, "left")
+        elif op == "<=":
+            lo, hi = 0, np.searchsorted(vals[:valid], value, "right")
+        elif op == ">":
+            lo, hi = np.searchsorted(vals[:valid], value, "right"), valid
+        elif op == ">=":
+            lo, hi = np.searchsorted(vals[:valid], value, "left"), valid
+        else:
+            lo, hi = np.searchsorted(vals[:valid], value, "left"), np.searchsorted(vals[:valid], value, "right")
+        # Se marcan las filas del tramo o, si es más barato, se desmarcan las de afuera
+        if hi - lo <= self.size // 2:
+            mask = np.zeros(self.size, dtype=bool)
+            mask[order[lo:hi]] = True
+        else:
+            mask = np.ones(self.size, dtype=bool)
+            mask[order[:lo]] = False
+            mask[order[hi:]] = False
+        return mask
+
+    def _predicate_mask(self, field, op, value):
+        key = (field, op, value)
+        with self._lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                return mask
+        if field in CATEGORICAL_FIELDS:
+            mask = self._categories[field][CATEGORICAL_FIELDS[field].index(value)]
+            if op == "!=":
+                mask = ~mask
+        elif op == "!=":
+            mask = ~self._range_mask(field, "=", value)
+            mask[self._order[field][self._valid[field]:]] = False
+        else:
+            mask = self._range_mask(field, op, value)
+        mask.setflags(write=False)
+        with self._lock:
+            self._masks[key] = mask
+            while len(self._masks) > self.cache_size * 4:
+                self._masks.popitem(last=False)
+        return mask
+
+    def _evaluate(self, node):
+        kind = node[0]
+        if kind == "cmp":
+            return self._predicate_mask(*node[1:])
+        if kind == "not":
+            return ~self._evaluate(node[1])
+        left, right = self._evaluate(node[1]), self._evaluate(node[2])
+        return left & right if kind == "and" else left | right
+
+    def matches(self, query):
+        """Índices de todas las filas que cumplen `query` (sin ordenar ni recortar)."""
+        return np.flatnonzero(self._evaluate(parse(query)))
+
+    def screen(self, query, limit=DEFAULT_LIMIT, sort_by="MKTCAP"):
+        """Filas que cumplen `query`, ordenadas por `sort_by` descendente (top `limit`)."""
+        tree = parse(query)
+        # El árbol y no canonical(): el texto redondea los números y mezclaría umbrales cercanos
+        key = (tree, limit, sort_by)
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                return result
+
+        matches = np.flatnonzero(self._evaluate(tree))
+        values = self.columns[sort_by][matches]
+        if len(matches) > limit:
+            top = np.argpartition(-values, limit - 1)[:limit]
+            top = top[np.argsort(-values[top], kind="stable")]
+        else:
+            top = np.argsort(-values, kind="stable")
+        rows = matches[top]
+        result = {
+            "query": canonical(tree),
+            "count": len(matches),
+            "universe": self.size,
+            "index": rows,
+            "rows": {name: self.columns[name][rows] for name in DISPLAY},
+        }
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._masks.clear()
+            self._results.clear()
+
+
+def get_screener():
+    return resources.shared("screener", lambda: Screener(build_universe()))
+
+
+# -------------------------------
+# LENGUAJE DE CONSULTA
+# -------------------------------
+# query     := or
+# or        := and (OR and)*
+# and       := not (AND not)*
+# not       := NOT not | "(" or ")" | predicate
+# predicate := FIELD (< | <= | > | >= | = | !=) VALUE
+# VALUE: número con sufijo opcional K/M/B/T (1.5B, 1e9) o categoría (SECTOR=TECH)
+_TOKEN = re.compile(r"\s*(?:(?P<num>-?\d+(?:\.\d*)?(?:E[+-]?\d+)?[KMBT]?(?![A-Z_]))"
+                    r"|(?P<op><=|>=|!=|<>|=|<|>)|(?P<paren>[()])|(?P<word>[A-Z_][A-Z0-9_]*))")
+_SUFFIX = {"K": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}
+
+
+def _tokenize(query):
+    text = query.upper()
+    tokens, pos = [], 0
+    while pos < len(text):
+        if text[pos:].isspace():
+            break
+        match = _TOKEN.match(text, pos)
+        if match is None or match.end() == pos:
+            raise ScreenError(f"Unexpected input at '{text[pos:].strip()[:12]}'")
+        kind = match.lastgroup
+        value = match.group(kind)
+        tokens.append((kind, "!=" if value == "<>" else value))
+        pos = match.end()
+    return tokens
+
+
+def _number(text):
+    if text[-1] in _SUFFIX:
+        return float(text[:-1]) * _SUFFIX[text[-1]]
+    return float(text)
+
+
+def parse(query):
+    tokens = _tokenize(query)
+    if not tokens:
+        raise ScreenError("Empty screen")
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else (None, None)
+
+    def take():
+        nonlocal pos
+        token = peek()
+        pos += 1
+        return token
+
+    def parse_or():
+        node = parse_and()
+        while peek() == ("word", "OR"):
+            take()
+            node = ("or", node, parse_and())
+        return node
+
+    def parse_and():
+        node = parse_not()
+        while peek() == ("word", "AND"):
+            take()
+            node = ("and", node, parse_not())
+        return node
+
+    def parse_not():
+        if peek() == ("word", "NOT"):
+            take()
+            return ("not", parse_not())
+        if peek() == ("paren", "("):
+            take()
+            node = parse_or()
+            if take() != ("paren", ")"):
+                raise ScreenError("Missing ')'")
+            return node
+        return parse_predicate()
+
+    def parse_predicate():
+        kind, field = take()
+        if kind is None:
+            raise ScreenError("Screen ends where a condition was expected")
+        if kind != "word" or (field not in NUMERIC_FIELDS and field not in CATEGORICAL_FIELDS):
+            raise ScreenError(f"Unknown field '{field}'. Fields: {', '.join([*NUMERIC_FIELDS, *CATEGORICAL_FIELDS])}")
+        kind, op = take()
+        if kind != "op":
+            raise ScreenError(f"Expected a comparison after {field}")
+        kind, raw = take()
+        if field in CATEGORICAL_FIELDS:
+            if op not in ("=", "!=") or raw not in CATEGORICAL_FIELDS[field]:
+                raise ScreenError(f"{field} supports = / != with one of: {', '.join(CATEGORICAL_FIELDS[field])}")
+            return ("cmp", field, op, raw)
+        if kind != "num":
+            raise ScreenError(f"Expected a number after {field}{op}")
+        return ("cmp", field, op, _number(raw))
+
+    tree = parse_or()
+    if pos != len(tokens):
+        raise ScreenError(f"Unexpected '{tokens[pos][1]}'")
+    return tree
+
+
+def canonical(node):
+    """Forma textual normalizada para mostrar (los números se redondean con :g)."""
+    kind = node[0]
+    if kind == "cmp":
+        _, field, op, value = node
+        return f"{field}{op}{value:g}" if isinstance(value, float) else f"{field}{op}{value}"
+    if kind == "not":
+        return f"NOT {canonical(node[1])}"
+    return f"({canonical(node[1])} {kind.upper()} {canonical(node[2])})"
+
+
+# -------------------------------
+# CLI
+# -------------------------------
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Screen the synthetic equity universe.")
+    parser.add_argument("query")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    screener = get_screener()
+    built = time.perf_counter()
+    result = screener.screen(args.query, args.limit)
+    done = time.perf_counter()
+    print(f"{result['query']}: {result['count']} / {result['universe']} "
+          f"(build {(built - start) * 1000:.0f} ms, screen {(done - built) * 1000:.1f} ms)")
+    rows = result["rows"]
+    for i in range(len(result["index"])):
+        print(f"{rows['TICKER'][i]:<10} {SECTORS[rows['SECTOR'][i]]:<14} {rows['MKTCAP'][i] / 1e9:>9.2f}B "
+              f"PE {rows['PE'][i]:>6.1f}  DIV {rows['DIVYLD'][i]:>5.2f}%")
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Full-text search over the knowledge base (inverted index + BM25)
+"""
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+import resources
+
+# -------------------------------
+# TOKENIZACIÓN (ES/EN, SIN ACENTOS)
+# -------------------------------
+STOPWORDS = frozenset("""
+a al con como de del el en es esta este la las lo los no o para por que se sin su sus un una uno y
+the a an of for to in on and or with which what who gives give me my is are works work function
+""".split())
+
+SUFFIXES = sorted([
+    "aciones", "acion", "idades", "idad", "mente", "ities", "ity", "ation", "ations",
+    "ing", "les", "ly", "es", "s",
+], key=len, reverse=True)
+
+# Consultas en inglés sobre una KB en español (tokens ya normalizados)
+SYNONYMS = {
+    "sovereign": "soberan",
+    "bond": "bono",
+    "pric": "preci",
+    "rate": "tasa",
+    "news": "notici",
+    "chart": "grafic",
+    "rating": "calific",
+    "debt": "deud",
+    "market": "mercad",
+    "export": "exportar",
+    "portfoli": "portafoli",
+    "stock": "accion",
+    "equity": "accion",
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold(text):
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def stem(word):
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            word = word[:-len(suffix)]
+            break
+    if len(word) > 4 and word[-1] in "aeo":
+        word = word[:-1]
+    return word
+
+
+def tokenize(text):
+    return [stem(w) for w in _WORD_RE.findall(fold(text)) if w not in STOPWORDS]
+
+
+def query_terms(query):
+    terms = set()
+    for token in tokenize(query):
+        terms.add(token)
+        if token in SYNONYMS:
+            terms.add(SYNONYMS[token])
+    return terms
+
+
+# -------------------------------
+# ÍNDICE INVERTIDO
+# -------------------------------
+FIELD_WEIGHTS = {
+    "purpose": 2.0,
+    "universe": 1.0,
+    "output": 1.0,
+    "assumptions": 0.5,
+    "not_applicable": 0.5,
+}
+
+
+class SearchIndex:
+
+    def __init__(self, postings, doc_len, k1=1.2, b=0.75, kb_digest=None):
+        self.postings = postings
+        self.doc_len = doc_len
+        # Digest de la fuente de la KB con la que se construyó (ver kb.KnowledgeBase.source_digest)
+        self.kb_digest = kb_digest
+        self.k1 = k1
+        self.b = b
+        self.avg_len = (sum(doc_len.values()) / len(doc_len)) if doc_len else 0.0
+        n = len(doc_len)
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in postings.items()
+        }
+
+    @classmethod
+    def build(cls, function_kb):
+        postings = defaultdict(dict)
+        doc_len = {}
+        for mnemonic, entry in function_kb.items():
+            tf = Counter()
+            for name, weight in FIELD_WEIGHTS.items():
+                value = entry.get(name) or ""
+                if isinstance(value, (list, tuple)):
+                    value = " ".join(value)
+                for token in tokenize(value):
+                    tf[token] += weight
+            tf[mnemonic.lower()] += FIELD_WEIGHTS["purpose"]
+            doc_len[mnemonic] = sum(tf.values())
+            for token, freq in tf.items():
+                postings[token][mnemonic] = freq
+        digest = getattr(function_kb, "source_digest", None)
+        return cls(dict(postings), doc_len, kb_digest=digest.hex() if digest else None)
+
+    def search(self, query, limit=5):
+        scores = defaultdict(float)
+        for term in query_terms(query):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = self.idf[term]
+            for mnemonic, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[mnemonic] / self.avg_len)
+                scores[mnemonic] += idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        return [(m, round(s, 4)) for m, s in ranked[:limit]]
+
+    # Índice preconstruido en disco
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"kb_digest": self.kb_digest, "postings": self.postings, "doc_len": self.doc_len},
+                      f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["postings"], data["doc_len"], kb_digest=data.get("kb_digest"))
+
+
+# Si existe un índice preconstruido de la misma KB se carga; si no, se construye al primer uso
+INDEX_PATH = os.environ.get("BBG_SEARCH_INDEX", "search_index.json")
+
+def _load_or_build():
+    from kb import FUNCTION_KB
+    if os.path.exists(INDEX_PATH):
+        index = SearchIndex.load(INDEX_PATH)
+        if index.kb_digest == FUNCTION_KB.source_digest.hex():
+            return index
+    return SearchIndex.build(FUNCTION_KB)
+
+
+def get_index():
+    return resources.shared("search_index", _load_or_build)
+
+
+# -------------------------------
+# CLI: índice preconstruido
+# -------------------------------
+if __name__ == "__main__":
+    import sys
+
+    from kb import FUNCTION_KB
+
+    out = sys.argv[1] if len(sys.argv) > 1 else INDEX_PATH
+    SearchIndex.build(FUNCTION_KB).save(out)
+    print(f"Search index written to {out}")
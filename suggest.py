@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Autocomplete and "did you mean" resolver for function mnemonics
+"""
+import resources
+
+# -------------------------------
+# TRIE DE PREFIJOS
+# -------------------------------
+class PrefixTrie:
+    """Cada nodo guarda sus completions ya ordenadas: la consulta es O(len(prefix))."""
+
+    def __init__(self, words, max_completions=10):
+        self.max_completions = max_completions
+        self.root = {"": []}
+        for word in sorted(set(words), key=lambda w: (len(w), w)):
+            node = self.root
+            self._keep(node, word)
+            for ch in word:
+                node = node.setdefault(ch, {"": []})
+                self._keep(node, word)
+
+    def _keep(self, node, word):
+        if len(node[""]) < self.max_completions:
+            node[""].append(word)
+
+    def complete(self, prefix, limit=None):
+        node = self.root
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return []
+        return node[""][:limit or self.max_completions]
+
+
+# -------------------------------
+# SYMMETRIC DELETE (DISTANCIA DE EDICIÓN)
+# -------------------------------
+def edit_distance(a, b):
+    """Distancia Damerau (OSA): una transposición adyacente cuenta como una sola edición."""
+    if a == b:
+        return 0
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            d = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                d = min(d, prev2[j - 2] + 1)
+            cur.append(d)
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class DeleteIndex:
+    """Symmetric delete: cada palabra se indexa por sus variantes con hasta `max_distance`
+    borrados; la consulta solo verifica las palabras que comparten alguna variante."""
+
+    def __init__(self, words, max_distance=2):
+        self.max_distance = max_distance
+        self.deletes = {}
+        for word in words:
+            for variant in _deletes(word, max_distance):
+                self.deletes.setdefault(variant, []).append(word)
+
+    def search(self, word, max_distance):
+        max_distance = min(max_distance, self.max_distance)
+        candidates = set()
+        for variant in _deletes(word, max_distance):
+            candidates.update(self.deletes.get(variant, ()))
+        found = []
+        for term in candidates:
+            if abs(len(term) - len(word)) <= max_distance:
+                d = edit_distance(word, term)
+                if d <= max_distance:
+                    found.append((d, term))
+        return found
+
+
+def _deletes(word, max_distance):
+    """La palabra y todas sus variantes con 1..max_distance caracteres borrados."""
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+# -------------------------------
+# ÍNDICE COMBINADO
+# -------------------------------
+class MnemonicIndex:
+
+    def __init__(self, mnemonics):
+        self.mnemonics = frozenset(mnemonics)
+        self.trie = PrefixTrie(self.mnemonics)
+        self.deletes = DeleteIndex(self.mnemonics)
+
+    def complete(self, prefix, limit=5):
+        return self.trie.complete(prefix.upper(), limit)
+
+    def did_you_mean(self, word, limit=3, max_distance=None):
+        word = word.upper()
+        if max_distance is None:
+            max_distance = 1 if len(word) <= 3 else 2
+        ranked = sorted(
+            self.deletes.search(word, max_distance),
+            key=lambda t: (t[0], not t[1].startswith(word[:1]), abs(len(t[1]) - len(word)), t[1]),
+        )
+        return [term for _, term in ranked[:limit]]
+
+
+def get_index():
+    """Índice por proceso: se construye una sola vez y se comparte entre reruns y sesiones."""
+    from kb import FUNCTION_KB
+    return resources.shared("suggest_index", lambda: MnemonicIndex(FUNCTION_KB))
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+Regression tests for multi-command pipelines
+"""
+import pytest
+
+from engine import execute, split_pipeline
+
+
+@pytest.mark.parametrize("command, stages", [
+    ("IBM US BVAL | SEARCH default probability | MIPD",
+     ["IBM US BVAL", "SEARCH default probability", "IBM US MIPD"]),
+    ("IBM US BVAL | EQS PE<15 | MIPD", ["IBM US BVAL", "EQS PE<15", "IBM US MIPD"]),
+    ("ibm us bval | bgn <go>", ["ibm us bval", "ibm us bgn"]),
+])
+def test_prefixed_stages_keep_the_inherited_context(command, stages):
+    assert split_pipeline(command) == stages
+
+
+@pytest.mark.parametrize("command", ["IBM US BVAL | HIST", "IBM US BVAL | PERF <GO>",
+                                     "IBM US BVAL | XLTP BGN IBM US"])
+def test_side_effect_stages_are_rejected(command):
+    result = execute(command)
+    assert result.error and not result.stages
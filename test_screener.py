@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+Regression tests for the EQS screener caches
+"""
+import numpy as np
+
+from screener import Screener, build_universe, canonical, parse
+
+
+def test_result_cache_keeps_close_thresholds_apart():
+    # Dos umbrales que `:g` muestra igual: el segundo excluye la fila con PE == x
+    columns = build_universe(n=5000)
+    pe = columns["PE"][~np.isnan(columns["PE"])]
+    x = float(np.median(pe))
+    low, high = f"PE>={x!r}", f"PE>={x * (1 + 1e-9)!r}"
+    assert canonical(parse(low)) == canonical(parse(high))
+
+    cached = Screener(columns)
+    first, second = cached.screen(low), cached.screen(high)
+    assert first["count"] == Screener(columns).screen(low)["count"]
+    assert second["count"] == Screener(columns).screen(high)["count"]
+    assert second["count"] == first["count"] - np.count_nonzero(pe == x)
+
+
+def test_result_cache_hits_on_equivalent_queries():
+    screener = Screener(build_universe(n=5000))
+    first = screener.screen("pe<15 and mktcap>1e9")
+    assert screener.screen("PE < 15  AND  MKTCAP > 1B") is first